@@ -4,19 +4,62 @@ Canvas LMS Automated Installer for Ubuntu 22.04
 A comprehensive guided installer with TUI interface
 """
 
+import importlib
 import os
 import sys
 import subprocess
 import json
 import time
 import logging
+import logging.handlers
+import platform
 import re
+import shutil
+import socket
+import urllib.error
+import urllib.request
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from canvas_installer.config import InstallationConfig
 
 try:
+    import orjson
+    
+    def _dump_state(state: Dict) -> bytes:
+        return orjson.dumps(state)
+except ImportError:
+    def _dump_state(state: Dict) -> bytes:
+        return json.dumps(state).encode()
+
+MARKER_DIR = os.path.expanduser("~/.canvas_installer/markers")
+
+CACHE_DIR = os.path.expanduser("~/.cache/canvas_installer")
+
+# sudo resets the environment, so the frontend has to be passed as an argument
+APT_GET = [
+    "sudo", "DEBIAN_FRONTEND=noninteractive", "apt-get",
+    "-o", "Dpkg::Use-Pty=0",
+    "-o", "Dpkg::Options::=--force-confdef",
+    "-o", "Dpkg::Options::=--force-confold"
+]
+
+def ensure_rich():
+    """Import the Rich components used by the installer, installing Rich if needed
+    
+    Deferred until after the privilege check so that failing fast never pays
+    for importing Rich.
+    """
+    global Console, Panel, Progress, SpinnerColumn, TextColumn, BarColumn
+    global TaskProgressColumn, HAS_TASK_PROGRESS, Prompt, Confirm, Table, box
+    try:
+        importlib.import_module("rich")
+    except ImportError:
+        print("Installing required dependencies...")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "rich"])
+    
     from rich.console import Console
     from rich.panel import Panel
     from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
@@ -27,51 +70,8 @@ try:
         HAS_TASK_PROGRESS = False
     from rich.prompt import Prompt, Confirm
     from rich.table import Table
-    from rich.text import Text
-    from rich.layout import Layout
-    from rich.live import Live
-    from rich.align import Align
-    from rich.padding import Padding
-    from rich import box
-except ImportError:
-    print("Installing required dependencies...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "rich"])
-    from rich.console import Console
-    from rich.panel import Panel
-    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
-    from rich.prompt import Prompt, Confirm
-    from rich.table import Table
-    from rich.text import Text
-    from rich.layout import Layout
-    from rich.live import Live
-    from rich.align import Align
-    from rich.padding import Padding
     from rich import box
 
-@dataclass
-class InstallationConfig:
-    """Configuration class to store all installation parameters"""
-    domain: str = ""
-    canvas_password: str = ""
-    smtp_server: str = ""
-    smtp_port: str = "465"
-    smtp_username: str = ""
-    smtp_password: str = ""
-    smtp_from_email: str = ""
-    smtp_from_name: str = ""
-    flickr_api_key: str = ""
-    youtube_api_key: str = ""
-    skip_ssl: bool = False
-    skip_rce: bool = False
-    skip_optimization: bool = False
-    
-    def to_dict(self) -> Dict:
-        return asdict(self)
-    
-    @classmethod
-    def from_dict(cls, data: Dict) -> 'InstallationConfig':
-        return cls(**data)
-
 class CanvasInstaller:
     """Main installer class with TUI interface"""
     
@@ -81,17 +81,23 @@ class CanvasInstaller:
         self.log_file = f"canvas_install_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         self.state_file = "canvas_install_state.json"
         self.current_step = 0
+        self.completed: Dict[str, Dict] = {}
         self.total_steps = 13
         
-        # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file),
-                logging.StreamHandler()
-            ]
-        )
+        # Setup logging; file writes are buffered and flushed every 64 records
+        # or immediately on errors (and at interpreter exit)
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler(self.log_file)
+        file_handler.setFormatter(formatter)
+        buffered_handler = logging.handlers.MemoryHandler(64, flushLevel=logging.ERROR, target=file_handler)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.INFO)
+        stream_handler.setFormatter(formatter)
+        
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(buffered_handler)
+        root_logger.addHandler(stream_handler)
         self.logger = logging.getLogger(__name__)
         
         # Installation steps
@@ -141,16 +147,27 @@ class CanvasInstaller:
         table.add_column("Status", style="bold")
         table.add_column("Details", style="dim")
         
-        all_passed = True
-        for check_name, check_func in checks:
+        def run_check(check_func):
             try:
                 result, details = check_func()
                 status = "[green]✓ PASS[/green]" if result else "[red]✗ FAIL[/red]"
-                table.add_row(check_name, status, details)
-                if not result:
-                    all_passed = False
+                return result, status, details
             except Exception as e:
-                table.add_row(check_name, "[red]✗ ERROR[/red]", str(e))
+                return False, "[red]✗ ERROR[/red]", str(e)
+        
+        # Checks are independent and mostly I/O-bound, so run them concurrently
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = {executor.submit(run_check, check_func): check_name for check_name, check_func in checks}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        # Render rows in the original order so the table is deterministic
+        all_passed = True
+        for check_name, _ in checks:
+            result, status, details = results[check_name]
+            table.add_row(check_name, status, details)
+            if not result:
                 all_passed = False
         
         self.console.print(table)
@@ -165,14 +182,13 @@ class CanvasInstaller:
     def _check_ubuntu_version(self) -> Tuple[bool, str]:
         """Check if running Ubuntu 22.04"""
         try:
-            with open('/etc/os-release', 'r') as f:
-                content = f.read()
-                if 'Ubuntu' in content and '22.04' in content:
-                    return True, "Ubuntu 22.04 LTS detected"
-                else:
-                    return False, "Ubuntu 22.04 LTS required"
-        except:
+            info = platform.freedesktop_os_release()
+        except OSError:
             return False, "Cannot determine OS version"
+        
+        if info.get('ID') == 'ubuntu' and info.get('VERSION_ID') == '22.04':
+            return True, "Ubuntu 22.04 LTS detected"
+        return False, "Ubuntu 22.04 LTS required"
 
     def _check_sudo_access(self) -> Tuple[bool, str]:
         """Check sudo access"""
@@ -188,15 +204,11 @@ class CanvasInstaller:
     def _check_hardware(self) -> Tuple[bool, str]:
         """Check hardware requirements"""
         try:
-            # Check RAM (8GB = 8,000,000 KB approximately)
-            with open('/proc/meminfo', 'r') as f:
-                for line in f:
-                    if line.startswith('MemTotal:'):
-                        mem_kb = int(line.split()[1])
-                        mem_gb = mem_kb / 1024 / 1024
-                        if mem_gb < 7.5:  # Allow some margin
-                            return False, f"RAM: {mem_gb:.1f}GB (8GB required)"
-                        break
+            # Check RAM
+            mem_bytes = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+            mem_gb = mem_bytes / (1024 ** 3)
+            if mem_gb < 7.5:  # Allow some margin
+                return False, f"RAM: {mem_gb:.1f}GB (8GB required)"
             
             # Check CPU cores
             cpu_count = os.cpu_count()
@@ -209,32 +221,22 @@ class CanvasInstaller:
 
     def _check_internet(self) -> Tuple[bool, str]:
         """Check internet connectivity"""
+        # TCP probe against the host we clone from; ICMP is often blocked
         try:
-            result = subprocess.run(['ping', '-c', '1', 'google.com'], 
-                                  capture_output=True, timeout=10)
-            if result.returncode == 0:
-                return True, "Internet connection verified"
-            else:
-                return False, "No internet connection"
-        except:
-            return False, "Cannot verify internet connection"
+            with socket.create_connection(("github.com", 443), timeout=3):
+                pass
+            return True, "Internet connection verified"
+        except OSError:
+            return False, "No internet connection"
 
     def _check_disk_space(self) -> Tuple[bool, str]:
         """Check available disk space"""
         try:
-            result = subprocess.run(['df', '-h', '/'], capture_output=True, text=True)
-            lines = result.stdout.strip().split('\n')
-            if len(lines) >= 2:
-                parts = lines[1].split()
-                available = parts[3]
-                # Parse available space (e.g., "50G" -> 50)
-                if 'G' in available:
-                    available_gb = float(available.replace('G', ''))
-                    if available_gb < 30:
-                        return False, f"Available: {available} (30GB required)"
-                    return True, f"Available: {available}"
-            return False, "Cannot determine disk space"
-        except:
+            available_gb = shutil.disk_usage('/').free / (1024 ** 3)
+            if available_gb < 30:
+                return False, f"Available: {available_gb:.1f}GB (30GB required)"
+            return True, f"Available: {available_gb:.1f}GB"
+        except OSError:
             return False, "Cannot check disk space"
 
     def collect_configuration(self):
@@ -290,11 +292,11 @@ class CanvasInstaller:
                 return True
             
             # Create canvas user
-            cmd = "sudo adduser --disabled-password --gecos '' canvas"
+            cmd = ["sudo", "adduser", "--disabled-password", "--gecos", "", "canvas"]
             self._run_command(cmd, "Creating canvas user")
             
             # Add to sudo group
-            cmd = "sudo usermod -aG sudo canvas"
+            cmd = ["sudo", "usermod", "-aG", "sudo", "canvas"]
             self._run_command(cmd, "Adding canvas user to sudo group")
             
             self.console.print("[green]✅ Canvas user created successfully[/green]")
@@ -309,6 +311,9 @@ class CanvasInstaller:
         """Setup PostgreSQL and create databases"""
         self.console.print("\n[bold yellow]🗄️  Setting up PostgreSQL...[/bold yellow]")
         
+        # Under sudo USER is usually root; SUDO_USER is the account that invoked us
+        invoking_user = os.environ.get('SUDO_USER') or os.environ.get('USER') or 'root'
+        
         try:
             with Progress(
                 SpinnerColumn(),
@@ -319,14 +324,22 @@ class CanvasInstaller:
                 # Install PostgreSQL
                 task = progress.add_task("Installing PostgreSQL...", total=None)
                 
-                commands = [
-                    "sudo apt-get update",
-                    "sudo apt-get install -y wget ca-certificates",
-                    "wget -qO - https://www.postgresql.org/media/keys/ACCC4CF8.asc | sudo tee /etc/apt/trusted.gpg.d/postgresql.asc",
-                    "echo \"deb http://apt.postgresql.org/pub/repos/apt/ $(lsb_release -cs)-pgdg main\" | sudo tee /etc/apt/sources.list.d/pgdg.list",
-                    "sudo apt-get update",
-                    "sudo apt-get install -y postgresql-14"
-                ]
+                # wget is needed to fetch the repository key, so it is installed up
+                # front; after the pgdg source is added only that list is refreshed
+                # rather than running a second full apt-get update
+                commands = []
+                if self._missing_pkgs(["postgresql-14"]):
+                    commands = [
+                        APT_GET + ["update"],
+                        APT_GET + ["install", "-y", "wget", "ca-certificates"],
+                        "wget -qO - https://www.postgresql.org/media/keys/ACCC4CF8.asc | sudo tee /etc/apt/trusted.gpg.d/postgresql.asc",
+                        "echo \"deb http://apt.postgresql.org/pub/repos/apt/ $(lsb_release -cs)-pgdg main\" | sudo tee /etc/apt/sources.list.d/pgdg.list",
+                        APT_GET + ["update", "-o", "Dir::Etc::sourcelist=sources.list.d/pgdg.list",
+                         "-o", "Dir::Etc::sourceparts=-", "-o", "APT::Get::List-Cleanup=0"],
+                        APT_GET + ["install", "-y", "postgresql-14"]
+                    ]
+                else:
+                    self.logger.info("postgresql-14 already installed, skipping package setup")
                 
                 for i, cmd in enumerate(commands):
                     progress.update(task, description=f"Installing PostgreSQL... ({i+1}/{len(commands)})")
@@ -339,16 +352,24 @@ class CanvasInstaller:
                 create_user_cmd = f"sudo -u postgres psql -c \"CREATE USER canvas WITH PASSWORD '{self.config.canvas_password}';\""
                 self._run_command(create_user_cmd, "Creating PostgreSQL canvas user", show_output=False)
                 
-                # Create databases
-                db_commands = [
-                    "sudo -u postgres createdb canvas_production --owner=canvas",
-                    "sudo -u postgres createdb canvas_development --owner=canvas",
-                    f"sudo -u postgres createuser {os.environ.get('USER', 'root')}",
-                    f"sudo -u postgres psql -c \"alter user {os.environ.get('USER', 'root')} with superuser\" postgres"
+                # Create databases; the creates touch different objects and can run
+                # concurrently, granting superuser needs the role to exist first
+                db_command_groups = [
+                    [
+                        ["sudo", "-u", "postgres", "createdb", "canvas_production", "--owner=canvas"],
+                        ["sudo", "-u", "postgres", "createdb", "canvas_development", "--owner=canvas"],
+                        ["sudo", "-u", "postgres", "createuser", invoking_user]
+                    ],
+                    [
+                        ["sudo", "-u", "postgres", "psql", "-c", 'alter user "{}" with superuser'.format(invoking_user.replace('"', '""')), "postgres"]
+                    ]
                 ]
                 
-                for cmd in db_commands:
-                    self._run_command(cmd, "Setting up databases")
+                for group in db_command_groups:
+                    with ThreadPoolExecutor(max_workers=len(group)) as executor:
+                        futures = [executor.submit(self._run_command, cmd, "Setting up databases") for cmd in group]
+                        for future in futures:
+                            future.result()
             
             self.console.print("[green]✅ PostgreSQL setup completed[/green]")
             return True
@@ -373,23 +394,49 @@ class CanvasInstaller:
                 
             with Progress(*progress_columns, transient=True) as progress:
                 
-                total_steps = 8
-                task = progress.add_task("Installing development tools...", total=total_steps)
+                # add-apt-repository must exist before the PPA can be added; every
+                # other package goes into a single apt transaction afterwards
+                dev_packages = [
+                    "git-core", "ruby3.3", "ruby3.3-dev", "zlib1g-dev", "libxml2-dev",
+                    "libsqlite3-dev", "postgresql", "libpq-dev", "libxmlsec1-dev",
+                    "libidn11-dev", "curl", "make", "g++"
+                ]
                 
-                steps = [
-                    ("sudo apt-get install -y git-core", "Installing Git"),
-                    ("sudo apt-get install -y software-properties-common", "Installing software properties"),
-                    ("sudo add-apt-repository -y ppa:instructure/ruby", "Adding Ruby PPA"),
-                    ("sudo apt-get update", "Updating package lists"),
-                    ("sudo apt-get install -y ruby3.3 ruby3.3-dev zlib1g-dev libxml2-dev libsqlite3-dev postgresql libpq-dev libxmlsec1-dev libidn11-dev curl make g++", "Installing Ruby and dependencies"),
-                    ("curl -o- https://raw.githubusercontent.com/nvm-sh/nvm/v0.39.0/install.sh | bash", "Installing NVM"),
-                    ("bash -c 'export NVM_DIR=\"$HOME/.nvm\" && [ -s \"$NVM_DIR/nvm.sh\" ] && . \"$NVM_DIR/nvm.sh\" && nvm install 18.20'", "Installing Node.js 18.20"),
-                    ("curl -o- -L https://yarnpkg.com/install.sh | bash -s -- --version 1.19.1", "Installing Yarn")
+                # Each entry is (command, description, marker); apt packages are
+                # filtered through dpkg, external installers are tracked by marker
+                steps = []
+                missing_packages = self._missing_pkgs(dev_packages)
+                if missing_packages:
+                    steps += [
+                        (APT_GET + ["install", "-y", "software-properties-common"], "Installing software properties", None),
+                        (["sudo", "add-apt-repository", "-y", "ppa:instructure/ruby"], "Adding Ruby PPA", None),
+                        (APT_GET + ["update"], "Updating package lists", None),
+                        (APT_GET + ["install", "-y"] + missing_packages, "Installing Git, Ruby and dependencies", None),
+                    ]
+                # Install scripts are fetched into the download cache right before
+                # they run, keyed by marker
+                downloads = {
+                    "nvm": ("https://raw.githubusercontent.com/nvm-sh/nvm/v0.39.0/install.sh", "nvm-v0.39.0-install.sh"),
+                    "yarn-1.19.1": ("https://yarnpkg.com/install.sh", "yarn-install.sh")
+                }
+                steps += [
+                    (["bash", os.path.join(CACHE_DIR, "nvm-v0.39.0-install.sh")], "Installing NVM", "nvm"),
+                    ("bash -c 'export NVM_DIR=\"$HOME/.nvm\" && [ -s \"$NVM_DIR/nvm.sh\" ] && . \"$NVM_DIR/nvm.sh\" && nvm install 18.20'", "Installing Node.js 18.20", "node-18.20"),
+                    (["bash", os.path.join(CACHE_DIR, "yarn-install.sh"), "--version", "1.19.1"], "Installing Yarn", "yarn-1.19.1")
                 ]
                 
-                for i, (cmd, desc) in enumerate(steps):
+                task = progress.add_task("Installing development tools...", total=len(steps))
+                
+                for i, (cmd, desc, marker) in enumerate(steps):
                     progress.update(task, description=desc, completed=i)
-                    self._run_command(cmd, desc)
+                    if marker and self._has_marker(marker):
+                        self.logger.info(f"Skipping (already done): {desc}")
+                    else:
+                        if marker in downloads:
+                            self._curl_cached(*downloads[marker])
+                        self._run_command(cmd, desc)
+                        if marker:
+                            self._set_marker(marker)
                     progress.update(task, completed=i+1)
             
             self.console.print("[green]✅ Development tools installed successfully[/green]")
@@ -400,28 +447,96 @@ class CanvasInstaller:
             self.console.print(f"[red]❌ Development tools installation failed: {e}[/red]")
             return False
 
-    def _run_command(self, command: str, description: str = "", show_output: bool = True, timeout: int = 600) -> subprocess.CompletedProcess:
-        """Execute a shell command with logging and error handling"""
+    def _missing_pkgs(self, pkgs: List[str]) -> List[str]:
+        """Return the packages from pkgs that dpkg does not report as installed"""
+        result = subprocess.run(
+            ["dpkg-query", "-W", "-f=${Package} ${Status}\n"] + pkgs,
+            capture_output=True,
+            text=True
+        )
+        installed = set()
+        for line in result.stdout.splitlines():
+            name, _, status = line.partition(' ')
+            if status.endswith("install ok installed"):
+                installed.add(name)
+        return [pkg for pkg in pkgs if pkg not in installed]
+
+    def _has_marker(self, name: str) -> bool:
+        """Check whether an external install has already completed"""
+        return os.path.isfile(os.path.join(MARKER_DIR, name))
+
+    def _set_marker(self, name: str):
+        """Record that an external install completed"""
+        os.makedirs(MARKER_DIR, exist_ok=True)
+        Path(MARKER_DIR, name).touch()
+
+    def _curl_cached(self, url: str, key: str) -> Path:
+        """Download url into the cache directory, revalidating with its ETag
+        
+        A 304 response (or no network) reuses the cached copy.
+        """
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = Path(CACHE_DIR, key)
+        etag_path = Path(CACHE_DIR, f"{key}.etag")
+        
+        request = urllib.request.Request(url)
+        if path.is_file() and etag_path.is_file():
+            request.add_header("If-None-Match", etag_path.read_text().strip())
+        
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                path.write_bytes(response.read())
+                etag = response.headers.get("ETag")
+            if etag:
+                etag_path.write_text(etag)
+            elif etag_path.exists():
+                etag_path.unlink()
+            self.logger.info(f"Downloaded {url}")
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            self.logger.info(f"Using cached copy of {url}")
+        except urllib.error.URLError:
+            if not path.is_file():
+                raise
+            self.logger.warning(f"Could not reach {url}, using cached copy")
+        return path
+
+    def _run_command(self, command: Union[str, List[str]], description: str = "", show_output: bool = True, timeout: int = 600,
+                     env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+        """Execute a command with logging and error handling
+        
+        String commands go through the shell; argv lists are executed directly
+        without spawning /bin/sh. Without an explicit env, the current
+        environment is used with DEBIAN_FRONTEND=noninteractive.
+        """
+        if env is None:
+            env = {**os.environ, "DEBIAN_FRONTEND": "noninteractive"}
+        use_shell = isinstance(command, str)
         self.logger.info(f"Executing: {description or command}")
         
         try:
             if show_output:
                 result = subprocess.run(
                     command,
-                    shell=True,
+                    shell=use_shell,
                     check=True,
                     timeout=timeout,
+                    env=env,
                     text=True,
                     capture_output=False
                 )
             else:
+                # Keep stderr for diagnostics but don't buffer potentially huge stdout
                 result = subprocess.run(
                     command,
-                    shell=True,
+                    shell=use_shell,
                     check=True,
                     timeout=timeout,
+                    env=env,
                     text=True,
-                    capture_output=True
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE
                 )
             
             self.logger.info(f"Command completed successfully: {description or command}")
@@ -443,12 +558,13 @@ class CanvasInstaller:
         """Save current installation state"""
         state = {
             'current_step': self.current_step,
+            'completed': self.completed,
             'config': self.config.to_dict(),
             'timestamp': datetime.now().isoformat()
         }
         
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        with open(self.state_file, 'wb') as f:
+            f.write(_dump_state(state))
 
     def _load_state(self) -> bool:
         """Load previous installation state"""
@@ -458,6 +574,11 @@ class CanvasInstaller:
                     state = json.load(f)
                 
                 self.current_step = state.get('current_step', 0)
+                self.completed = state.get('completed')
+                if self.completed is None:
+                    # State written before per-step tracking: everything before
+                    # current_step finished successfully
+                    self.completed = {name: {} for name, _ in self.steps[:self.current_step]}
                 self.config = InstallationConfig.from_dict(state.get('config', {}))
                 return True
         except Exception as e:
@@ -532,22 +653,33 @@ class CanvasInstaller:
         # Implementation will be added in next iteration
         return True
 
-    def run_installation(self):
-        """Main installation process"""
+    def run_installation(self, state_exists: Optional[bool] = None):
+        """Main installation process
+        
+        state_exists lets the caller pass on a state-file check it has already
+        made; it is computed here when omitted.
+        """
         self.show_banner()
         
+        if state_exists is None:
+            state_exists = os.path.isfile(self.state_file)
+        
         # Load previous state if exists
-        if os.path.exists(self.state_file):
+        if state_exists:
             if Confirm.ask("\n[cyan]Previous installation found. Resume from where you left off?[/cyan]"):
                 self._load_state()
                 self.console.print(f"[green]Resuming from step {self.current_step + 1}[/green]")
             else:
                 os.remove(self.state_file)
                 self.current_step = 0
+                self.completed = {}
         
         # Run installation steps
         try:
-            for i, (step_name, step_func) in enumerate(self.steps[self.current_step:], self.current_step):
+            for i, (step_name, step_func) in enumerate(self.steps):
+                if step_name in self.completed:
+                    continue
+                
                 self.console.print(f"\n[bold blue]📍 Step {i + 1}/{self.total_steps}: {step_name}[/bold blue]")
                 
                 if not step_func():
@@ -556,10 +688,11 @@ class CanvasInstaller:
                     return False
                 
                 self.current_step = i + 1
+                self.completed[step_name] = {"ts": time.time()}
                 self._save_state()
                 
                 if i < len(self.steps) - 1:
-                    time.sleep(1)  # Brief pause between steps
+                    self.console.rule(style="dim")
             
             # Installation completed
             self.console.print("\n" + "="*60)
@@ -573,7 +706,7 @@ class CanvasInstaller:
             self.console.print(success_panel)
             
             # Clean up state file
-            if os.path.exists(self.state_file):
+            if os.path.isfile(self.state_file):
                 os.remove(self.state_file)
                 
             return True
@@ -593,14 +726,16 @@ def main():
         print("This installer requires sudo privileges. Please run with sudo.")
         sys.exit(1)
     
+    ensure_rich()
     installer = CanvasInstaller()
     
     # Collect configuration if not resuming
-    if not os.path.exists(installer.state_file):
+    state_exists = os.path.isfile(installer.state_file)
+    if not state_exists:
         installer.collect_configuration()
     
     # Run the installation
-    success = installer.run_installation()
+    success = installer.run_installation(state_exists)
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
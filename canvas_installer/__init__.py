@@ -3,10 +3,18 @@ Canvas LMS Automated Installer for Ubuntu 22.04
 A comprehensive guided installer with TUI interface
 """
 
-from .installer import CanvasInstaller
 from .config import InstallationConfig
 
 __version__ = "1.0.0"
 __author__ = "Canvas Installer Team"
 
-__all__ = ["CanvasInstaller", "InstallationConfig"]
\ No newline at end of file
+__all__ = ["CanvasInstaller", "InstallationConfig"]
+
+
+def __getattr__(name):
+    # CanvasInstaller pulls in Rich and every step module, so only import it
+    # on first access; importing the config alone stays lightweight
+    if name == "CanvasInstaller":
+        from .installer import CanvasInstaller
+        return CanvasInstaller
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,11 +2,14 @@
 Configuration management for Canvas LMS installer
 """
 
-from dataclasses import dataclass, asdict
+import os
+import platform
+import secrets
+from dataclasses import dataclass, field, fields
 from typing import Dict
 
 
-@dataclass
+@dataclass(slots=True)
 class InstallationConfig:
     """Configuration class to store all installation parameters"""
     domain: str = ""
@@ -22,10 +25,40 @@ class InstallationConfig:
     skip_ssl: bool = False
     skip_rce: bool = False
     skip_optimization: bool = False
+    # Who ran the installer (through sudo); looked up once, never persisted
+    invoking_user: str = field(init=False, repr=False)
+    invoking_home: str = field(init=False, repr=False)
+    # Release codename for apt sources, read from os-release instead of
+    # running lsb_release for each source line
+    distro_codename: str = field(init=False, repr=False)
+    # Keys for security.yml and the RCE API, generated up front for the steps
+    encryption_key: str = field(init=False, repr=False)
+    ecosystem_secret: str = field(init=False, repr=False)
+    ecosystem_key: str = field(init=False, repr=False)
+    cipher_password: str = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.invoking_user = os.environ.get('SUDO_USER') or os.environ.get('USER') or 'root'
+        self.invoking_home = os.path.expanduser(f'~{self.invoking_user}')
+        try:
+            os_release = platform.freedesktop_os_release()
+        except OSError:
+            os_release = {}
+        # Ubuntu 22.04 is the only supported release
+        self.distro_codename = (os_release.get('VERSION_CODENAME')
+                                or os_release.get('UBUNTU_CODENAME') or 'jammy')
+        self.encryption_key = secrets.token_hex(32)
+        self.ecosystem_secret = secrets.token_hex(32)
+        self.ecosystem_key = secrets.token_hex(32)
+        self.cipher_password = secrets.token_hex(16)
     
     def to_dict(self) -> Dict:
-        return asdict(self)
+        # All fields are primitives, so a flat copy is enough (no asdict deep copy)
+        return {f.name: getattr(self, f.name) for f in _FIELDS}
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'InstallationConfig':
-        return cls(**data)
\ No newline at end of file
+        return cls(**data)
+
+
+_FIELDS = tuple(f for f in fields(InstallationConfig) if f.init)
\ No newline at end of file
@@ -2,13 +2,23 @@
 Main Canvas LMS installer with TUI interface
 """
 
+import argparse
 import os
+import subprocess
 import sys
 import json
-import time
+import tempfile
 import logging
+import logging.handlers
+import queue
+import re
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import fields
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 try:
     from rich.console import Console
@@ -17,7 +27,6 @@ try:
     from rich import box
 except ImportError:
     print("Rich library not found. Installing required dependencies...")
-    import subprocess
     
     # Try pip first, then fallback to apt
     try:
@@ -53,12 +62,23 @@ except ImportError:
         sys.exit(1)
 
 from .config import InstallationConfig
-from .steps import (
-    PrerequisitesStep, CanvasUserStep, PostgreSQLStep, DevToolsStep,
-    CloneCanvasStep, ConfigureCanvasStep, DependenciesStep, ApacheStep,
-    SSLStep, VirtualHostsStep, JobsFirewallStep, RedisStep, RCEStep, FinalizeStep
+from .utils import CommandRunner, close_all_shells
+from . import steps
+
+# Every package the steps install from the stock Ubuntu archive, downloaded in
+# the background once prerequisites pass. Packages from the PPA, pgdg and
+# Passenger repositories are left out; they aren't known to apt until their
+# steps add those sources, and one unknown name fails the whole download.
+ALL_APT_PACKAGES = (
+    "software-properties-common", "git-core", "zlib1g-dev", "libxml2-dev",
+    "libsqlite3-dev", "postgresql", "libpq-dev", "libxmlsec1-dev", "libidn11-dev",
+    "curl", "make", "g++", "wget", "ca-certificates", "libyaml-dev", "cmdtest",
+    "apache2", "dirmngr", "gnupg", "apt-transport-https", "libapache2-mod-xsendfile",
+    "certbot", "python3-certbot-apache", "redis-server", "screen",
 )
 
+DOMAIN_PATTERN = re.compile(r'(?=.{1,253}$)([a-z0-9](-*[a-z0-9])*)(\.[a-z0-9](-*[a-z0-9])*)+')
+
 
 class CanvasInstaller:
     """Main installer class with TUI interface"""
@@ -69,36 +89,56 @@ class CanvasInstaller:
         self.log_file = f"canvas_install_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         self.state_file = "canvas_install_state.json"
         self.current_step = 0
+        self.completed_steps = []
         self.total_steps = 14
+        self._state_lock = threading.Lock()
+        self._last_state_bytes = None
+        self._state_cache = None
         
-        # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file),
-                logging.StreamHandler()
-            ]
-        )
+        # Keep apt and its helpers from prompting; commands inherit these
+        os.environ["DEBIAN_FRONTEND"] = "noninteractive"
+        os.environ["APT_LISTCHANGES_FRONTEND"] = "none"
+        
+        # Setup logging. Records are queued and written by a background
+        # thread so steps never block on the log file or the terminal
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        handlers = [logging.FileHandler(self.log_file), logging.StreamHandler()]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        log_queue = queue.SimpleQueue()
+        self.log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self.log_listener.start()
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
         self.logger = logging.getLogger(__name__)
         
-        # Installation steps - using modular step classes
+        # Installation steps - using modular step classes, named here and only
+        # imported when they run. Each entry lists the steps it depends on;
+        # steps whose dependencies are met run in parallel.
+        # SSL runs alone because Certbot prompts interactively, so everything
+        # else that can go before it (Redis, RCE, Apache, jobs and firewall) does.
+        # Apache waits for DevTools, whose full apt-get update its first
+        # install relies on. Dependencies waits for RCE, which rewrites files
+        # in /var/canvas/config that the rake tasks load.
         self.steps = [
-            ("System Prerequisites Check", PrerequisitesStep),
-            ("Create Canvas User", CanvasUserStep),
-            ("Install PostgreSQL & Setup Databases", PostgreSQLStep),
-            ("Install Git, Ruby, Node.js & Yarn", DevToolsStep),
-            ("Clone & Install Canvas LMS", CloneCanvasStep),
-            ("Configure Database, Mail & Domain", ConfigureCanvasStep),
-            ("Install Dependencies & Compile Assets", DependenciesStep),
-            ("Install & Configure Apache", ApacheStep),
-            ("Setup SSL Certificate", SSLStep),
-            ("Configure Virtual Hosts", VirtualHostsStep),
-            ("Setup Jobs & Firewall", JobsFirewallStep),
-            ("Setup Redis Cache", RedisStep),
-            ("Enable Rich Content Editor", RCEStep),
-            ("Set Permissions & Optimization", FinalizeStep)
+            ("System Prerequisites Check", "PrerequisitesStep", ()),
+            ("Create Canvas User", "CanvasUserStep", ("PrerequisitesStep",)),
+            ("Install PostgreSQL & Setup Databases", "PostgreSQLStep", ("CanvasUserStep",)),
+            ("Install Git, Ruby, Node.js & Yarn", "DevToolsStep", ("CanvasUserStep",)),
+            ("Clone & Install Canvas LMS", "CloneCanvasStep", ("DevToolsStep",)),
+            ("Configure Database, Mail & Domain", "ConfigureCanvasStep", ("CloneCanvasStep",)),
+            ("Install Dependencies & Compile Assets", "DependenciesStep", ("PostgreSQLStep", "ConfigureCanvasStep", "RedisStep", "RCEStep")),
+            ("Install & Configure Apache", "ApacheStep", ("DevToolsStep",)),
+            ("Setup SSL Certificate", "SSLStep", ("DependenciesStep", "ApacheStep", "RedisStep", "RCEStep", "JobsFirewallStep")),
+            ("Configure Virtual Hosts", "VirtualHostsStep", ("SSLStep",)),
+            ("Setup Jobs & Firewall", "JobsFirewallStep", ("DependenciesStep", "RedisStep")),
+            ("Setup Redis Cache", "RedisStep", ("CanvasUserStep",)),
+            ("Enable Rich Content Editor", "RCEStep", ("CloneCanvasStep",)),
+            ("Set Permissions & Optimization", "FinalizeStep", ("VirtualHostsStep",))
         ]
+        self.max_parallel_steps = 3
+        self.prefetch_proc = None
 
     def show_banner(self):
         """Display the installer banner"""
@@ -112,16 +152,63 @@ class CanvasInstaller:
         self.console.print(banner)
         self.console.print()
 
+    def _load_config_file(self, path: str):
+        """Load configuration answers from a YAML or JSON file"""
+        with open(path) as f:
+            if path.endswith('.json'):
+                data = json.load(f)
+            else:
+                try:
+                    import yaml
+                except ImportError:
+                    self.console.print("[red]PyYAML is not installed; install python3-yaml or use a .json config file[/red]")
+                    sys.exit(1)
+                data = yaml.safe_load(f) or {}
+        
+        # Only the user-facing answers; derived values such as the invoking
+        # user and the generated keys can't be set from a file
+        allowed = {f.name: f.type for f in fields(InstallationConfig) if f.init}
+        for key, value in data.items():
+            if key not in allowed:
+                self.console.print(f"[red]Unknown configuration key in {path}: {key}[/red]")
+                sys.exit(1)
+            # A string such as "no" would otherwise count as true
+            if allowed[key] is bool and not isinstance(value, bool):
+                self.console.print(f"[red]{key} in {path} must be true or false, not {value!r}[/red]")
+                sys.exit(1)
+            setattr(self.config, key, value)
+        
+        # The same checks the interactive prompts apply
+        self.config.domain = str(self.config.domain).strip().lower()
+        if not DOMAIN_PATTERN.fullmatch(self.config.domain):
+            self.console.print(f"[red]Invalid domain in {path}: {self.config.domain!r}[/red]")
+            sys.exit(1)
+        self.config.smtp_port = str(self.config.smtp_port).strip()
+        if not (self.config.smtp_port.isdigit() and 1 <= int(self.config.smtp_port) <= 65535):
+            self.console.print(f"[red]Invalid SMTP port in {path}: {self.config.smtp_port!r} (1-65535)[/red]")
+            sys.exit(1)
+
     def collect_configuration(self):
         """Collect configuration from user"""
+        config_path = os.environ.get('CANVAS_INSTALL_CONFIG')
+        if config_path:
+            self._load_config_file(config_path)
+            self.console.print(f"[green]Loaded configuration from {config_path}[/green]")
+            self._save_state()
+            return
+        
         self.console.print("\n[bold cyan]📋 Configuration Setup[/bold cyan]")
         self.console.print("Please provide the following information for your Canvas installation:\n")
         
-        # Domain configuration
-        self.config.domain = Prompt.ask(
-            "[yellow]Domain name for Canvas[/yellow] (e.g., canvas.example.com)",
-            default=""
-        ).strip()
+        # Domain configuration; checked now rather than failing at the SSL step
+        while True:
+            self.config.domain = Prompt.ask(
+                "[yellow]Domain name for Canvas[/yellow] (e.g., canvas.example.com)",
+                default=""
+            ).strip().lower()
+            if DOMAIN_PATTERN.fullmatch(self.config.domain):
+                break
+            self.console.print("[red]Please enter a valid domain name, e.g. canvas.example.com[/red]")
         
         # PostgreSQL password
         self.config.canvas_password = Prompt.ask(
@@ -132,8 +219,16 @@ class CanvasInstaller:
         # SMTP Configuration
         if Confirm.ask("\n[cyan]Configure email settings now?[/cyan]", default=True):
             self.console.print("\n[dim]SMTP Configuration (for Canvas notifications)[/dim]")
-            self.config.smtp_server = Prompt.ask("SMTP Server", default="smtp.gmail.com")
-            self.config.smtp_port = Prompt.ask("SMTP Port", default="465")
+            self.config.smtp_server = Prompt.ask("SMTP Server", default="smtp.gmail.com").strip()
+            try:
+                socket.getaddrinfo(self.config.smtp_server, None)
+            except socket.gaierror:
+                self.console.print(f"[yellow]⚠️  Could not resolve {self.config.smtp_server}; check it before sending mail[/yellow]")
+            while True:
+                self.config.smtp_port = Prompt.ask("SMTP Port", default="465").strip()
+                if self.config.smtp_port.isdigit() and 1 <= int(self.config.smtp_port) <= 65535:
+                    break
+                self.console.print("[red]Please enter a port number between 1 and 65535[/red]")
             self.config.smtp_username = Prompt.ask("SMTP Username/Email")
             self.config.smtp_password = Prompt.ask("SMTP Password", password=True)
             self.config.smtp_from_email = Prompt.ask("From Email Address")
@@ -155,23 +250,47 @@ class CanvasInstaller:
 
     def _save_state(self):
         """Save current installation state"""
-        state = {
-            'current_step': self.current_step,
-            'config': self.config.to_dict(),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        with self._state_lock:
+            state = {
+                'current_step': self.current_step,
+                'completed_steps': self.completed_steps,
+                'config': self.config.to_dict(),
+            }
+            # The timestamp changes on every call, so compare without it
+            key = json.dumps(state, separators=(",", ":")).encode()
+            if key == self._last_state_bytes:
+                return
+            state['timestamp'] = datetime.now().isoformat()
+
+            # Write to a sibling temp file and swap it in so a crash never
+            # leaves a half-written state file behind
+            with tempfile.NamedTemporaryFile(
+                'w', dir=os.path.dirname(self.state_file) or '.', delete=False
+            ) as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(f.name, self.state_file)
+            self._last_state_bytes = key
+
+    def _read_state_file(self) -> dict:
+        """Parse the state file, reusing the last parse if it hasn't changed"""
+        mtime = os.stat(self.state_file).st_mtime_ns
+        if self._state_cache is None or self._state_cache[0] != mtime:
+            with open(self.state_file, 'r') as f:
+                self._state_cache = (mtime, json.load(f))
+        return self._state_cache[1]
 
     def _load_state(self) -> bool:
         """Load previous installation state"""
         try:
             if os.path.exists(self.state_file):
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
+                state = self._read_state_file()
                 
                 self.current_step = state.get('current_step', 0)
+                # Older state files only recorded how many steps had finished in order
+                self.completed_steps = state.get(
+                    'completed_steps',
+                    [name for name, _, _ in self.steps[:self.current_step]]
+                )
                 self.config = InstallationConfig.from_dict(state.get('config', {}))
                 return True
         except Exception as e:
@@ -179,37 +298,105 @@ class CanvasInstaller:
         
         return False
 
-    def run_installation(self):
-        """Main installation process"""
+    def _start_apt_prefetch(self):
+        """Start downloading packages in the background so later installs only unpack"""
+        if self.prefetch_proc is not None:
+            return
+        try:
+            self.prefetch_proc = subprocess.Popen(
+                ["sudo", "apt-get", "install", "--download-only", "-y", "-qq", *ALL_APT_PACKAGES],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            CommandRunner.prefetch_proc = self.prefetch_proc
+            self.logger.info("Prefetching apt packages in the background")
+        except OSError as e:
+            # Not fatal; each step downloads its own packages as before
+            self.logger.warning(f"Could not start apt prefetch: {e}")
+
+    def _run_steps(self) -> bool:
+        """Run pending steps, starting each one as soon as its dependencies complete"""
+        done = {step_class for name, step_class, _ in self.steps if name in self.completed_steps}
+        pending = [(i, name, step_class, deps) for i, (name, step_class, deps) in enumerate(self.steps)
+                   if step_class not in done]
+        running = {}
+        failed_step = None
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_parallel_steps)
+        try:
+            while pending or running:
+                if "PrerequisitesStep" in done:
+                    self._start_apt_prefetch()
+                
+                if failed_step is None:
+                    for entry in [entry for entry in pending if set(entry[3]) <= done]:
+                        i, step_name, step_class, _ = entry
+                        pending.remove(entry)
+                        self.console.print(f"\n[bold blue]📍 Step {i + 1}/{self.total_steps}: {step_name}[/bold blue]")
+                        
+                        # Import the step, create an instance and run it (skipped if already satisfied)
+                        step_instance = getattr(steps, step_class)(self.config, self.console, self.logger)
+                        running[executor.submit(step_instance.run)] = (step_name, step_class)
+                
+                if not running:
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step_name, step_class = running.pop(future)
+                    if future.result():
+                        done.add(step_class)
+                        self.completed_steps.append(step_name)
+                        self.current_step = len(self.completed_steps)
+                        self._save_state()
+                    elif failed_step is None:
+                        failed_step = step_name
+                        # Steps still queued behind the busy workers never start
+                        for queued in [queued for queued in running if queued.cancel()]:
+                            del running[queued]
+        except BaseException:
+            # Ctrl-C or an unexpected error: drop queued steps, kill the
+            # commands still running and don't wait for their threads
+            executor.shutdown(wait=False, cancel_futures=True)
+            close_all_shells()
+            raise
+        executor.shutdown()
+        
+        if failed_step is not None:
+            self.console.print(f"\n[red]❌ Installation failed at step: {failed_step}[/red]")
+            self.console.print("[yellow]Check the log file for details and run the installer again to resume.[/yellow]")
+            return False
+        return True
+
+    def run_installation(self, state_exists: Optional[bool] = None):
+        """Main installation process
+        
+        state_exists is whether a state file was there before the
+        configuration was collected; collecting it writes one, so the caller
+        has to check first. It is computed here when omitted.
+        """
         self.show_banner()
         
+        if state_exists is None:
+            state_exists = os.path.exists(self.state_file)
+        
         # Load previous state if exists
-        if os.path.exists(self.state_file):
+        if state_exists:
             if Confirm.ask("\n[cyan]Previous installation found. Resume from where you left off?[/cyan]"):
                 self._load_state()
-                self.console.print(f"[green]Resuming from step {self.current_step + 1}[/green]")
+                self.console.print(f"[green]Resuming with {len(self.completed_steps)}/{self.total_steps} steps already completed[/green]")
             else:
                 os.remove(self.state_file)
                 self.current_step = 0
+                self.completed_steps = []
+                # Starting over needs the answers the saved state held
+                self.collect_configuration()
         
         # Run installation steps
         try:
-            for i, (step_name, step_class) in enumerate(self.steps[self.current_step:], self.current_step):
-                self.console.print(f"\n[bold blue]📍 Step {i + 1}/{self.total_steps}: {step_name}[/bold blue]")
-                
-                # Create step instance and execute
-                step_instance = step_class(self.config, self.console, self.logger)
-                
-                if not step_instance.execute():
-                    self.console.print(f"\n[red]❌ Installation failed at step: {step_name}[/red]")
-                    self.console.print("[yellow]Check the log file for details and run the installer again to resume.[/yellow]")
-                    return False
-                
-                self.current_step = i + 1
-                self._save_state()
-                
-                if i < len(self.steps) - 1:
-                    time.sleep(1)  # Brief pause between steps
+            if not self._run_steps():
+                return False
             
             # Installation completed
             self.console.print("\n" + "="*60)
@@ -240,10 +427,19 @@ class CanvasInstaller:
             self.logger.error(f"Installation failed: {e}")
             self.console.print(f"\n[red]❌ Installation failed: {e}[/red]")
             return False
+        finally:
+            self.log_listener.stop()
 
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Canvas LMS Automated Installer")
+    parser.add_argument("--force-recheck", action="store_true",
+                        help="re-run every prerequisite check instead of using cached results")
+    args = parser.parse_args()
+    if args.force_recheck:
+        steps.PrerequisitesStep.force_recheck = True
+    
     if os.geteuid() != 0 and not os.environ.get('SUDO_USER'):
         print("This installer requires sudo privileges. Please run with sudo.")
         sys.exit(1)
@@ -251,11 +447,12 @@ def main():
     installer = CanvasInstaller()
     
     # Collect configuration if not resuming
-    if not os.path.exists(installer.state_file):
+    state_exists = os.path.exists(installer.state_file)
+    if not state_exists:
         installer.collect_configuration()
     
     # Run the installation
-    success = installer.run_installation()
+    success = installer.run_installation(state_exists)
     sys.exit(0 if success else 1)
 
 
@@ -2,20 +2,26 @@
 Installation steps for Canvas LMS installer
 """
 
-from .step_01_prerequisites import PrerequisitesStep
-from .step_02_canvas_user import CanvasUserStep
-from .step_03_postgresql import PostgreSQLStep
-from .step_04_dev_tools import DevToolsStep
-from .step_05_clone_canvas import CloneCanvasStep
-from .step_06_configure_canvas import ConfigureCanvasStep
-from .step_07_dependencies import DependenciesStep
-from .step_08_apache import ApacheStep
-from .step_09_ssl import SSLStep
-from .step_10_virtual_hosts import VirtualHostsStep
-from .step_11_jobs_firewall import JobsFirewallStep
-from .step_12_redis import RedisStep
-from .step_13_rce import RCEStep
-from .step_14_finalize import FinalizeStep
+import importlib
+
+# Step classes are imported on first access (PEP 562) so the installer only
+# loads the modules for steps it actually runs
+_STEP_MODULES = {
+    "PrerequisitesStep": ".step_01_prerequisites",
+    "CanvasUserStep": ".step_02_canvas_user",
+    "PostgreSQLStep": ".step_03_postgresql",
+    "DevToolsStep": ".step_04_dev_tools",
+    "CloneCanvasStep": ".step_05_clone_canvas",
+    "ConfigureCanvasStep": ".step_06_configure_canvas",
+    "DependenciesStep": ".step_07_dependencies",
+    "ApacheStep": ".step_08_apache",
+    "SSLStep": ".step_09_ssl",
+    "VirtualHostsStep": ".step_10_virtual_hosts",
+    "JobsFirewallStep": ".step_11_jobs_firewall",
+    "RedisStep": ".step_12_redis",
+    "RCEStep": ".step_13_rce",
+    "FinalizeStep": ".step_14_finalize",
+}
 
 __all__ = [
     "PrerequisitesStep",
@@ -32,4 +38,12 @@ __all__ = [
     "RedisStep",
     "RCEStep",
     "FinalizeStep"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _STEP_MODULES:
+        step_class = getattr(importlib.import_module(_STEP_MODULES[name], __name__), name)
+        globals()[name] = step_class
+        return step_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,13 +3,20 @@ Base class for installation steps
 """
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from rich.console import Console
+from rich.markup import escape
 from rich.progress import Progress
 import logging
+import threading
 
 from ..config import InstallationConfig
 from ..utils import CommandRunner
 
+# Rich allows a single live display per console; steps running in parallel
+# share it on a first-come basis
+_live_display_lock = threading.Lock()
+
 
 class BaseStep(ABC):
     """Base class for all installation steps"""
@@ -37,11 +44,20 @@ class BaseStep(ABC):
         """Execute the installation step. Returns True if successful, False otherwise."""
         pass
     
+    def is_satisfied(self) -> bool:
+        """Cheaply check whether the system already has what this step sets up"""
+        return False
+    
     def log_start(self):
         """Log the start of this step"""
         self.console.print(f"\n[bold yellow]{self.step_description}[/bold yellow]")
         self.logger.info(f"Starting step: {self.step_name}")
     
+    def log_skipped(self):
+        """Log that this step's work is already in place"""
+        self.console.print(f"[green]⏭️  {self.step_name} skipped (already satisfied)[/green]")
+        self.logger.info(f"Step skipped (already satisfied): {self.step_name}")
+    
     def log_success(self):
         """Log successful completion of this step"""
         self.console.print(f"[green]✅ {self.step_name} completed successfully[/green]")
@@ -52,10 +68,47 @@ class BaseStep(ABC):
         self.console.print(f"[red]❌ {self.step_name} failed: {error}[/red]")
         self.logger.error(f"Step failed: {self.step_name} - {error}")
     
-    def run_command(self, command: str, description: str = "", show_output: bool = True, timeout: int = 600):
+    def run(self) -> bool:
+        """Execute the step unless its work is already in place"""
+        if self.is_satisfied():
+            self.log_skipped()
+            return True
+        return self.execute()
+    
+    @contextmanager
+    def progress(self, *columns, **kwargs):
+        """Progress display for this step
+        
+        Hidden while another step owns the live display, and when output isn't
+        a terminal so no redraws end up in piped or captured logs.
+        """
+        owns_display = self.console.is_terminal and _live_display_lock.acquire(blocking=False)
+        try:
+            with Progress(*columns, console=self.console, disable=not owns_display, **kwargs) as progress:
+                yield progress
+        finally:
+            if owns_display:
+                _live_display_lock.release()
+    
+    def run_command(self, command: str, description: str = "", show_output: bool = True, timeout: int = 600,
+                    interactive: bool = False, on_line=None):
         """Convenience method to run a command"""
-        return self.cmd_runner.run_command(command, description, show_output, timeout)
+        return self.cmd_runner.run_command(command, description, show_output, timeout, interactive, on_line)
+    
+    def apt_install_batch(self, packages, description: str = "Installing packages", show_output: bool = True,
+                          timeout: int = 600, on_line=None, no_recommends: bool = False):
+        """Convenience method to install several packages at once"""
+        return self.cmd_runner.apt_install_batch(packages, description, show_output, timeout, on_line, no_recommends)
+    
+    @staticmethod
+    def progress_line(progress, task, prefix: str):
+        """on_line callback that shows a command's latest output in a progress task"""
+        return lambda line: progress.update(task, description=f"{prefix} [dim]{escape(line[:60])}[/dim]")
     
     def write_config_file(self, filepath: str, content: str, sudo: bool = False):
         """Convenience method to write a config file"""
-        self.cmd_runner.write_config_file(filepath, content, sudo)
\ No newline at end of file
+        self.cmd_runner.write_config_file(filepath, content, sudo)
+    
+    def write_config_files_batch(self, files, description: str = "Writing config files"):
+        """Convenience method to write several config files at once"""
+        self.cmd_runner.write_config_files_batch(files, description)
\ No newline at end of file
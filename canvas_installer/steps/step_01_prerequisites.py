@@ -2,14 +2,23 @@
 Step 1: System Prerequisites Check
 """
 
+import asyncio
+import hashlib
+import json
+import os
 from rich.table import Table
 from .base_step import BaseStep
 from ..utils import SystemChecker
 
+PREREQ_CACHE_FILE = "_prereq_cache.json"
+
 
 class PrerequisitesStep(BaseStep):
     """Check system prerequisites before installation"""
     
+    # Set from the --force-recheck command line flag
+    force_recheck = False
+    
     @property
     def step_name(self) -> str:
         return "System Prerequisites Check"
@@ -18,18 +27,44 @@ class PrerequisitesStep(BaseStep):
     def step_description(self) -> str:
         return "🔍 Checking System Prerequisites..."
     
+    def _system_fingerprint(self) -> str:
+        """Hash the slow-changing facts the cached checks depend on"""
+        digest = hashlib.blake2b()
+        with open('/etc/os-release', 'rb') as f:
+            digest.update(f.read())
+        with open('/proc/meminfo', 'rb') as f:
+            digest.update(f.readline())  # MemTotal; later lines fluctuate
+        digest.update(f"{os.cpu_count()}:{os.geteuid()}".encode())
+        return digest.hexdigest()
+    
+    def _load_cached_rows(self, fingerprint: str):
+        """Return cached check rows if they were all passing for this system"""
+        if self.force_recheck:
+            return None
+        try:
+            with open(PREREQ_CACHE_FILE, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get('hash') != fingerprint or not all(row[1] for row in cache.get('results', [])):
+            return None
+        return {name: (result, details) for name, result, details in cache['results']}
+    
     def execute(self) -> bool:
         """Execute prerequisites check"""
         self.log_start()
         
         try:
-            checks = [
-                ("Operating System", SystemChecker.check_ubuntu_version),
-                ("Root/Sudo Access", SystemChecker.check_sudo_access),
-                ("Hardware Requirements", SystemChecker.check_hardware),
-                ("Internet Connectivity", SystemChecker.check_internet),
-                ("Disk Space", SystemChecker.check_disk_space)
-            ]
+            try:
+                fingerprint = self._system_fingerprint()
+            except OSError:
+                fingerprint = None
+            cached = self._load_cached_rows(fingerprint) if fingerprint else None
+            
+            # Volatile checks such as free disk space are always re-run
+            pending = [name for name, _ in SystemChecker.CHECKS
+                       if not (cached and name in cached and name not in SystemChecker.VOLATILE_CHECKS)]
+            checked = asyncio.run(SystemChecker.check_all(pending))
             
             table = Table(title="System Prerequisites Check")
             table.add_column("Check", style="cyan")
@@ -37,19 +72,30 @@ class PrerequisitesStep(BaseStep):
             table.add_column("Details", style="dim")
             
             all_passed = True
-            for check_name, check_func in checks:
-                try:
-                    result, details = check_func()
-                    status = "[green]✓ PASS[/green]" if result else "[red]✗ FAIL[/red]"
-                    table.add_row(check_name, status, details)
-                    if not result:
+            results = []
+            for check_name, _ in SystemChecker.CHECKS:
+                if check_name in checked:
+                    outcome = checked[check_name]
+                    if isinstance(outcome, BaseException):
+                        table.add_row(check_name, "[red]✗ ERROR[/red]", str(outcome))
                         all_passed = False
-                except Exception as e:
-                    table.add_row(check_name, "[red]✗ ERROR[/red]", str(e))
+                        continue
+                    result, details = outcome
+                    results.append((check_name, result, details))
+                else:
+                    result, details = cached[check_name]
+                    details = f"{details} (cached)"
+                status = "[green]✓ PASS[/green]" if result else "[red]✗ FAIL[/red]"
+                table.add_row(check_name, status, details)
+                if not result:
                     all_passed = False
             
             self.console.print(table)
             
+            if fingerprint and not cached:
+                with open(PREREQ_CACHE_FILE, 'w') as f:
+                    json.dump({'hash': fingerprint, 'results': results}, f)
+            
             if not all_passed:
                 self.console.print("\n[red]❌ Prerequisites check failed. Please resolve the issues above before continuing.[/red]")
                 return False
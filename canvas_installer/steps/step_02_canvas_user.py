@@ -2,7 +2,7 @@
 Step 2: Create Canvas User
 """
 
-import subprocess
+import pwd
 from .base_step import BaseStep
 
 
@@ -17,26 +17,32 @@ class CanvasUserStep(BaseStep):
     def step_description(self) -> str:
         return "👤 Creating Canvas User..."
     
+    def is_satisfied(self) -> bool:
+        try:
+            pwd.getpwnam('canvas')
+            return True
+        except KeyError:
+            return False
+    
     def execute(self) -> bool:
         """Execute canvas user creation"""
         self.log_start()
         
         try:
             # Check if canvas user already exists
-            result = subprocess.run(['id', 'canvas'], capture_output=True)
-            if result.returncode == 0:
+            try:
+                pwd.getpwnam('canvas')
                 self.console.print("[green]Canvas user already exists[/green]")
                 self.log_success()
                 return True
+            except KeyError:
+                pass
             
-            # Create canvas user
-            cmd = "sudo adduser --disabled-password --gecos '' canvas"
+            # Create canvas user with a home directory, in the sudo group and
+            # with password login disabled
+            cmd = "sudo useradd -m -s /bin/bash -G sudo -p '*' canvas"
             self.run_command(cmd, "Creating canvas user")
             
-            # Add to sudo group
-            cmd = "sudo usermod -aG sudo canvas"
-            self.run_command(cmd, "Adding canvas user to sudo group")
-            
             self.log_success()
             return True
             
@@ -2,8 +2,10 @@
 Step 3: PostgreSQL Installation and Setup
 """
 
-import os
-from rich.progress import Progress, SpinnerColumn, TextColumn
+import shlex
+import shutil
+import subprocess
+from rich.progress import SpinnerColumn, TextColumn
 try:
     from rich.progress import TaskProgressColumn
     HAS_TASK_PROGRESS = True
@@ -11,10 +13,35 @@ except ImportError:
     HAS_TASK_PROGRESS = False
 from .base_step import BaseStep
 
+# Returns 1 once the canvas role and both databases exist
+SETUP_DONE_QUERY = (
+    "SELECT 1 FROM pg_roles WHERE rolname = 'canvas' AND (SELECT count(*) FROM pg_database"
+    " WHERE datname IN ('canvas_production', 'canvas_development')) = 2"
+)
+
 
 class PostgreSQLStep(BaseStep):
     """Setup PostgreSQL and create databases"""
     
+    def __init__(self, config, console, logger):
+        super().__init__(config, console, logger)
+        
+        # Build the role and database commands once, quoting the password as
+        # an SQL literal and every user-supplied value for the shell
+        password = self.config.canvas_password.replace("'", "''")
+        user = self.config.invoking_user
+        self._create_user_cmd = "sudo -u postgres psql -c " + shlex.quote(
+            f"CREATE USER canvas WITH PASSWORD '{password}';"
+        )
+        self._db_commands = (
+            "sudo -u postgres createdb canvas_production --owner=canvas",
+            "sudo -u postgres createdb canvas_development --owner=canvas",
+            f"sudo -u postgres createuser {shlex.quote(user)}",
+            "sudo -u postgres psql -c " + shlex.quote(
+                'alter user "{}" with superuser'.format(user.replace('"', '""'))
+            ) + " postgres",
+        )
+    
     @property
     def step_name(self) -> str:
         return "Install PostgreSQL & Setup Databases"
@@ -23,12 +50,24 @@ class PostgreSQLStep(BaseStep):
     def step_description(self) -> str:
         return "🗄️  Setting up PostgreSQL..."
     
+    def is_satisfied(self) -> bool:
+        if not shutil.which('psql'):
+            return False
+        try:
+            result = subprocess.run(
+                ['sudo', '-u', 'postgres', 'psql', '-tAc', SETUP_DONE_QUERY],
+                capture_output=True, text=True, timeout=10
+            )
+            return result.stdout.strip() == '1'
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+    
     def execute(self) -> bool:
         """Execute PostgreSQL setup"""
         self.log_start()
         
         try:
-            with Progress(
+            with self.progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 transient=True
@@ -37,35 +76,35 @@ class PostgreSQLStep(BaseStep):
                 # Install PostgreSQL
                 task = progress.add_task("Installing PostgreSQL...", total=None)
                 
+                # wget has to be present to fetch the repository key; once the
+                # pgdg source is registered only that list needs refreshing.
+                # Package lists are installed with apt_install_batch
                 commands = [
                     "sudo apt-get update",
-                    "sudo apt-get install -y wget ca-certificates",
+                    ["wget", "ca-certificates"],
                     "wget -qO - https://www.postgresql.org/media/keys/ACCC4CF8.asc | sudo tee /etc/apt/trusted.gpg.d/postgresql.asc",
-                    "echo \"deb http://apt.postgresql.org/pub/repos/apt/ $(lsb_release -cs)-pgdg main\" | sudo tee /etc/apt/sources.list.d/pgdg.list",
-                    "sudo apt-get update",
-                    "sudo apt-get install -y postgresql-14"
+                    f"echo 'deb http://apt.postgresql.org/pub/repos/apt/ {self.config.distro_codename}-pgdg main' | sudo tee /etc/apt/sources.list.d/pgdg.list",
+                    "sudo apt-get update -o Dir::Etc::sourcelist=sources.list.d/pgdg.list -o Dir::Etc::sourceparts=- -o APT::Get::List-Cleanup=0",
+                    ["postgresql-14"]
                 ]
                 
                 for i, cmd in enumerate(commands):
-                    progress.update(task, description=f"Installing PostgreSQL... ({i+1}/{len(commands)})")
-                    self.run_command(cmd, f"PostgreSQL install step {i+1}")
+                    prefix = f"Installing PostgreSQL... ({i+1}/{len(commands)})"
+                    progress.update(task, description=prefix)
+                    on_line = self.progress_line(progress, task, prefix)
+                    if isinstance(cmd, list):
+                        self.apt_install_batch(cmd, f"PostgreSQL install step {i+1}", on_line=on_line)
+                    else:
+                        self.run_command(cmd, f"PostgreSQL install step {i+1}", on_line=on_line)
                 
                 # Create PostgreSQL user and databases
                 progress.update(task, description="Creating PostgreSQL user and databases...")
                 
                 # Create canvas user with password
-                create_user_cmd = f"sudo -u postgres psql -c \"CREATE USER canvas WITH PASSWORD '{self.config.canvas_password}';\""
-                self.run_command(create_user_cmd, "Creating PostgreSQL canvas user", show_output=False)
+                self.run_command(self._create_user_cmd, "Creating PostgreSQL canvas user", show_output=False)
                 
                 # Create databases
-                db_commands = [
-                    "sudo -u postgres createdb canvas_production --owner=canvas",
-                    "sudo -u postgres createdb canvas_development --owner=canvas",
-                    f"sudo -u postgres createuser {os.environ.get('USER', 'root')}",
-                    f"sudo -u postgres psql -c \"alter user {os.environ.get('USER', 'root')} with superuser\" postgres"
-                ]
-                
-                for cmd in db_commands:
+                for cmd in self._db_commands:
                     self.run_command(cmd, "Setting up databases")
             
             self.log_success()
@@ -2,7 +2,13 @@
 Step 4: Install Development Tools
 """
 
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from rich.progress import SpinnerColumn, TextColumn, BarColumn
 try:
     from rich.progress import TaskProgressColumn
     HAS_TASK_PROGRESS = True
@@ -10,6 +16,21 @@ except ImportError:
     HAS_TASK_PROGRESS = False
 from .base_step import BaseStep
 
+NVM_INSTALL_URL = "https://raw.githubusercontent.com/nvm-sh/nvm/v0.39.0/install.sh"
+YARN_INSTALL_URL = "https://yarnpkg.com/install.sh"
+
+# Downloaded install scripts are kept here between runs, each next to a
+# .b2 file holding the blake2b digest it had when it was downloaded
+SCRIPT_CACHE_DIR = "/var/cache/canvas-installer"
+# yarn's install.sh is unversioned, so cached scripts are fetched again
+# once they are older than this (seconds)
+SCRIPT_CACHE_MAX_AGE = 7 * 24 * 3600
+
+BASHRC_MARKER = "# >>> canvas-installer nvm >>>"
+BASHRC_BLOCK = '''export NVM_DIR="$HOME/.nvm"
+[ -s "$NVM_DIR/nvm.sh" ] && . "$NVM_DIR/nvm.sh"
+export PATH="$HOME/.yarn/bin:$HOME/.config/yarn/global/node_modules/.bin:$PATH"'''
+
 
 class DevToolsStep(BaseStep):
     """Install Git, Ruby, Node.js, and Yarn"""
@@ -22,6 +43,66 @@ class DevToolsStep(BaseStep):
     def step_description(self) -> str:
         return "🛠️  Installing Development Tools..."
     
+    def is_satisfied(self) -> bool:
+        home = os.path.expanduser('~')
+        return (shutil.which('ruby3.3') is not None
+                and bool(glob.glob(f'{home}/.nvm/versions/node/v18.20*/bin/node'))
+                and os.path.exists(f'{home}/.yarn/bin/yarn'))
+    
+    def _ensure_bashrc_block(self, path: str, marker: str, content: str):
+        """Append content to path between markers, unless an earlier run already did"""
+        try:
+            with open(path) as f:
+                if marker in f.read():
+                    return
+        except FileNotFoundError:
+            pass
+        with open(path, 'a') as f:
+            f.write(f"\n{marker}\n{content}\n{marker.replace('>>>', '<<<')}\n")
+        self.logger.info(f"Added environment setup to {path}")
+    
+    @staticmethod
+    def _digest(path: str) -> str:
+        """blake2b hex digest of a file"""
+        with open(path, 'rb') as f:
+            return hashlib.blake2b(f.read()).hexdigest()
+    
+    def _is_cached(self, path: str) -> bool:
+        """Whether path holds a complete download that is still fresh"""
+        try:
+            if time.time() - os.path.getmtime(path) > SCRIPT_CACHE_MAX_AGE:
+                return False
+            with open(f"{path}.b2") as f:
+                return self._digest(path) == f.read().strip()
+        except OSError:
+            return False
+    
+    def _fetch_scripts(self, scripts):
+        """Return cache paths for (filename, url) scripts, downloading the missing ones in one curl run"""
+        os.makedirs(SCRIPT_CACHE_DIR, mode=0o700, exist_ok=True)
+        paths = [os.path.join(SCRIPT_CACHE_DIR, name) for name, _ in scripts]
+        missing = [(path, url) for path, (_, url) in zip(paths, scripts) if not self._is_cached(path)]
+        if not missing:
+            self.logger.info("Using cached NVM and Yarn installers")
+            return paths
+        
+        # Downloaded into a staging directory and only moved into the cache
+        # once curl has succeeded, so a failed run never leaves a partial file
+        staging = tempfile.mkdtemp(prefix="download-", dir=SCRIPT_CACHE_DIR)
+        try:
+            targets = " ".join(f"-o {os.path.join(staging, os.path.basename(path))} {url}" for path, url in missing)
+            self.run_command(
+                f"curl --compressed --http2 --parallel --parallel-immediate --no-progress-meter -sSfL {targets}",
+                "Downloading NVM and Yarn installers"
+            )
+            for path, _ in missing:
+                os.replace(os.path.join(staging, os.path.basename(path)), path)
+                with open(f"{path}.b2", 'w') as f:
+                    f.write(self._digest(path))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return paths
+    
     def execute(self) -> bool:
         """Execute development tools installation"""
         self.log_start()
@@ -35,30 +116,50 @@ class DevToolsStep(BaseStep):
             if HAS_TASK_PROGRESS:
                 progress_columns.append(TaskProgressColumn())
                 
-            with Progress(*progress_columns, transient=True) as progress:
+            with self.progress(*progress_columns, transient=True) as progress:
                 
                 total_steps = 8
                 task = progress.add_task("Installing development tools...", total=total_steps)
                 
-                # Step 1: Install basic packages
+                # Step 1: Install basic packages. This step can start before any
+                # other has refreshed the package lists, so it does that first;
+                # add-apt-repository has to exist before the PPA can be added,
+                # and refreshes the lists itself. Everything else is one
+                # transaction. Package lists are installed with apt_install_batch;
+                # the dev packages skip their recommends
+                dev_packages = ["git-core", "software-properties-common", "ruby3.3", "ruby3.3-dev", "zlib1g-dev",
+                                "libxml2-dev", "libsqlite3-dev", "postgresql", "libpq-dev", "libxmlsec1-dev",
+                                "libidn11-dev", "curl", "make", "g++"]
                 basic_steps = [
-                    ("sudo apt-get install -y git-core", "Installing Git"),
-                    ("sudo apt-get install -y software-properties-common", "Installing software properties"),
-                    ("sudo add-apt-repository -y ppa:instructure/ruby", "Adding Ruby PPA"),
                     ("sudo apt-get update", "Updating package lists"),
-                    ("sudo apt-get install -y ruby3.3 ruby3.3-dev zlib1g-dev libxml2-dev libsqlite3-dev postgresql libpq-dev libxmlsec1-dev libidn11-dev curl make g++", "Installing Ruby and dependencies")
+                    (["software-properties-common"], "Installing software properties"),
+                    ("sudo add-apt-repository -y ppa:instructure/ruby", "Adding Ruby PPA"),
+                    (dev_packages, "Installing dev packages")
                 ]
                 
                 for i, (cmd, desc) in enumerate(basic_steps):
                     progress.update(task, description=desc, completed=i)
-                    self.run_command(cmd, desc)
+                    on_line = self.progress_line(progress, task, desc)
+                    if isinstance(cmd, list):
+                        self.apt_install_batch(cmd, desc, on_line=on_line, no_recommends=cmd is dev_packages)
+                    else:
+                        self.run_command(cmd, desc, on_line=on_line)
                     progress.update(task, completed=i+1)
                 
-                # Step 2: Install NVM and Node.js with proper permissions
+                # Step 2: Fetch the NVM and Yarn install scripts in one curl run
+                # (parallel transfers, compressed, a single TLS setup per host)
+                progress.update(task, description="Downloading NVM and Yarn installers...", completed=4)
+                nvm_script, yarn_script = self._fetch_scripts([
+                    ("nvm_install.sh", NVM_INSTALL_URL),
+                    ("yarn_install.sh", YARN_INSTALL_URL)
+                ])
+                progress.update(task, completed=5)
+                
+                # Step 3: Install NVM and Node.js with proper permissions
                 progress.update(task, description="Installing NVM and Node.js...", completed=5)
-                nvm_node_cmd = '''bash -c "
+                nvm_node_cmd = f'''bash -c "
                     # Install NVM
-                    curl -o- https://raw.githubusercontent.com/nvm-sh/nvm/v0.39.0/install.sh | bash &&
+                    bash {nvm_script} &&
                     
                     # Fix permissions if needed
                     chmod +x $HOME/.nvm/nvm.sh &&
@@ -71,12 +172,13 @@ class DevToolsStep(BaseStep):
                     node --version &&
                     npm --version
                 "'''
-                self.run_command(nvm_node_cmd, "Installing NVM and Node.js")
+                self.run_command(nvm_node_cmd, "Installing NVM and Node.js",
+                                 on_line=self.progress_line(progress, task, "Installing NVM and Node.js..."))
                 progress.update(task, completed=6)
                 
-                # Step 3: Install Yarn with Node.js available and clean install
+                # Step 4: Install Yarn with Node.js available and clean install
                 progress.update(task, description="Installing Yarn...", completed=6)
-                yarn_cmd = '''bash -c "
+                yarn_cmd = f'''bash -c "
                     # Clean any existing Yarn installation
                     rm -rf $HOME/.yarn 2>/dev/null || true &&
                     
@@ -84,23 +186,19 @@ class DevToolsStep(BaseStep):
                     export NVM_DIR=\"$HOME/.nvm\" &&
                     [ -s \"$NVM_DIR/nvm.sh\" ] && . \"$NVM_DIR/nvm.sh\" &&
                     nvm use 18.20 &&
-                    curl -o- -L https://yarnpkg.com/install.sh | bash -s -- --version 1.19.1 &&
+                    bash {yarn_script} --version 1.19.1 &&
                     
                     # Verify installation
                     export PATH=\"$HOME/.yarn/bin:$HOME/.config/yarn/global/node_modules/.bin:$PATH\" &&
                     yarn --version
                 "'''
-                self.run_command(yarn_cmd, "Installing Yarn")
+                self.run_command(yarn_cmd, "Installing Yarn",
+                                 on_line=self.progress_line(progress, task, "Installing Yarn..."))
                 progress.update(task, completed=7)
                 
-                # Step 4: Create environment setup script
+                # Step 5: Create environment setup script
                 progress.update(task, description="Setting up environment...", completed=7)
-                env_setup = '''cat >> ~/.bashrc << 'EOF'
-export NVM_DIR="$HOME/.nvm"
-[ -s "$NVM_DIR/nvm.sh" ] && . "$NVM_DIR/nvm.sh"
-export PATH="$HOME/.yarn/bin:$HOME/.config/yarn/global/node_modules/.bin:$PATH"
-EOF'''
-                self.run_command(env_setup, "Setting up environment")
+                self._ensure_bashrc_block(os.path.expanduser('~/.bashrc'), BASHRC_MARKER, BASHRC_BLOCK)
                 progress.update(task, completed=8)
             
             self.log_success()
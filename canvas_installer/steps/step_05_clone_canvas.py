@@ -2,10 +2,23 @@
 Step 5: Clone and Install Canvas LMS
 """
 
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import SpinnerColumn, TextColumn
 from .base_step import BaseStep
 
 
+def safe_directory_cmd(directory: str, user: str = "") -> str:
+    """Shell command adding a git safe.directory entry for user (root by default)
+    
+    Appends to the user's ~/.gitconfig directly, and only when the entry is
+    missing, instead of running git config on every install.
+    """
+    gitconfig = f"~{user}/.gitconfig"
+    entry = rf"printf '[safe]\n\tdirectory = %s\n' '{directory}'"
+    writer = f"| sudo -u {user} tee -a {gitconfig} > /dev/null" if user else f">> {gitconfig}"
+    pattern = directory.replace("*", r"\*")
+    return rf"grep -qs '^\s*directory = {pattern}$' {gitconfig} || {entry} {writer}"
+
+
 class CloneCanvasStep(BaseStep):
     """Clone Canvas LMS repository and setup initial configuration"""
     
@@ -22,7 +35,7 @@ class CloneCanvasStep(BaseStep):
         self.log_start()
         
         try:
-            with Progress(
+            with self.progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 transient=True
@@ -34,38 +47,26 @@ class CloneCanvasStep(BaseStep):
                 progress.update(task, description="Preparing Canvas installation...")
                 
                 # Step 1: Setup Git safe directories and clone as root first
-                setup_cmd = """bash -c "
-                    # Configure Git to handle ownership issues
-                    git config --global --add safe.directory '*' &&
-                    git config --global user.name 'Canvas Installer' &&
-                    git config --global user.email 'installer@canvas.local' &&
-                    
-                    # Clone Canvas to /var
+                self.run_command(safe_directory_cmd("*"), "Configuring Git safe directories")
+                # Clone only the tip of the prod branch to /var; a checkout left
+                # by an earlier run is just brought up to date. Runs directly in
+                # the root shell, no nested bash -c
+                setup_cmd = """
                     cd /var &&
-                    git clone https://github.com/instructure/canvas-lms.git canvas &&
-                    cd /var/canvas &&
-                    git checkout prod
-                " """
+                    if [ -d /var/canvas/.git ]; then
+                        git -C /var/canvas fetch --depth 1 origin prod &&
+                        git -C /var/canvas reset --hard FETCH_HEAD
+                    else
+                        git clone --depth 1 --branch prod --single-branch https://github.com/instructure/canvas-lms.git canvas
+                    fi
+                """
                 
                 self.run_command(setup_cmd, "Cloning Canvas repository", timeout=600)
                 
                 # Step 2: Fix ownership after successful clone
                 progress.update(task, description="Setting up Canvas permissions...")
-                ownership_cmd = """bash -c "
-                    # Set proper ownership for canvas user
-                    chown -R canvas:canvas /var/canvas &&
-                    
-                    # Configure Git for canvas user
-                    sudo -u canvas git config --global --add safe.directory /var/canvas &&
-                    sudo -u canvas git config --global user.name 'Canvas User' &&
-                    sudo -u canvas git config --global user.email 'canvas@localhost' &&
-                    
-                    # Verify we're on the right branch
-                    cd /var/canvas &&
-                    sudo -u canvas git status
-                " """
-                
-                self.run_command(ownership_cmd, "Setting up ownership and permissions")
+                self.run_command("sudo chown -R canvas:canvas /var/canvas", "Setting up ownership and permissions")
+                self.run_command(safe_directory_cmd("/var/canvas", user="canvas"), "Configuring Git for canvas user")
                 
                 # Copy configuration files
                 progress.update(task, description="Setting up configuration files...")
@@ -74,9 +75,9 @@ class CloneCanvasStep(BaseStep):
                     "domain", "file_store", "outgoing_mail", "security", "external_migration"
                 ]
                 
-                for config in config_files:
-                    cmd = f"cd /var/canvas && sudo -u canvas cp config/{config}.yml.example config/{config}.yml"
-                    self.run_command(cmd, f"Copying {config} config")
+                cmd = (f"cd /var/canvas && sudo -u canvas bash -c "
+                       f"'for f in {' '.join(config_files)}; do cp config/$f.yml.example config/$f.yml || exit 1; done'")
+                self.run_command(cmd, "Copying example configs")
             
             self.log_success()
             return True
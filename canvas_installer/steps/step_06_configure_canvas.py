@@ -2,9 +2,28 @@
 Step 6: Configure Canvas Settings
 """
 
-import secrets
 from .base_step import BaseStep
 
+# Point Canvas's cache at the local Redis; RedisStep also uses these
+CACHE_STORE_CONFIG = """test:
+  cache_store: redis_cache_store
+development:
+  cache_store: redis_cache_store
+production:
+  cache_store: redis_cache_store"""
+
+REDIS_CONFIG = """production:
+  url:
+    - redis://localhost
+
+development:
+  url:
+    - redis://localhost
+
+test:
+  url:
+    - redis://localhost"""
+
 
 class ConfigureCanvasStep(BaseStep):
     """Configure Canvas database, mail, and domain settings"""
@@ -23,6 +42,8 @@ class ConfigureCanvasStep(BaseStep):
         
         try:
             config_dir = "/var/canvas/config"
+            # Collected here and written together in one root command at the end
+            files = []
             
             # Configure database.yml
             self.console.print("[cyan]Configuring database settings...[/cyan]")
@@ -46,7 +67,7 @@ development:
   host: localhost
   timeout: 5000
 """
-            self.write_config_file(f"{config_dir}/database.yml", database_config, sudo=True)
+            files.append((f"{config_dir}/database.yml", database_config))
             
             # Configure dynamic_settings.yml
             self.console.print("[cyan]Configuring dynamic settings...[/cyan]")
@@ -63,7 +84,7 @@ development:
       rich-content-service:
         app-host: "http://localhost:3001"
 """
-            self.write_config_file(f"{config_dir}/dynamic_settings.yml", dynamic_config, sudo=True)
+            files.append((f"{config_dir}/dynamic_settings.yml", dynamic_config))
             
             # Configure outgoing_mail.yml if SMTP details provided
             if self.config.smtp_server:
@@ -83,7 +104,7 @@ development:
 development:
   delivery_method: test
 """
-                self.write_config_file(f"{config_dir}/outgoing_mail.yml", mail_config, sudo=True)
+                files.append((f"{config_dir}/outgoing_mail.yml", mail_config))
             
             # Configure domain.yml
             self.console.print("[cyan]Configuring domain settings...[/cyan]")
@@ -96,20 +117,25 @@ development:
   domain: "canvas.localhost"
   ssl: false
 """
-            self.write_config_file(f"{config_dir}/domain.yml", domain_config, sudo=True)
+            files.append((f"{config_dir}/domain.yml", domain_config))
             
             # Configure security.yml
             self.console.print("[cyan]Configuring security settings...[/cyan]")
-            encryption_key = secrets.token_hex(32)
-            
             security_config = f"""production: &default
-  encryption_key: {encryption_key}
+  encryption_key: {self.config.encryption_key}
   lti_iss: '{self.config.domain}'
 
 development:
   <<: *default
 """
-            self.write_config_file(f"{config_dir}/security.yml", security_config, sudo=True)
+            files.append((f"{config_dir}/security.yml", security_config))
+            
+            # Configure Redis as the cache store
+            self.console.print("[cyan]Configuring cache store...[/cyan]")
+            files.append((f"{config_dir}/cache_store.yml", CACHE_STORE_CONFIG))
+            files.append((f"{config_dir}/redis.yml", REDIS_CONFIG))
+            
+            self.write_config_files_batch(files, "Writing Canvas configuration files")
             
             self.log_success()
             return True
@@ -2,7 +2,7 @@
 Step 7: Install Dependencies and Compile Assets
 """
 
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from rich.progress import SpinnerColumn, TextColumn, BarColumn
 try:
     from rich.progress import TaskProgressColumn
     HAS_TASK_PROGRESS = True
@@ -35,14 +35,17 @@ class DependenciesStep(BaseStep):
             if HAS_TASK_PROGRESS:
                 progress_columns.append(TaskProgressColumn())
                 
-            with Progress(*progress_columns, transient=True) as progress:
+            with self.progress(*progress_columns, transient=True) as progress:
                 
-                total_steps = 12
+                total_steps = 11
                 task = progress.add_task("Installing dependencies...", total=total_steps)
                 
+                desc = "Installing YAML development libraries and command test utilities"
+                progress.update(task, description=desc)
+                self.apt_install_batch(["libyaml-dev", "cmdtest"], desc, timeout=1800)
+                progress.update(task, completed=1)
+                
                 commands = [
-                    ("sudo apt-get install -y libyaml-dev", "Installing YAML development libraries"),
-                    ("sudo apt-get install -y cmdtest", "Installing command test utilities"),
                     ("sudo gem install bundler --version 2.5.10", "Installing Bundler"),
                     ("cd /var/canvas && sudo -u canvas bundle config set --local path vendor/bundle", "Configuring bundle path"),
                     ("cd /var/canvas && sudo -u canvas bundle install", "Installing Ruby gems"),
@@ -55,7 +58,7 @@ class DependenciesStep(BaseStep):
                     ("cd /var/canvas && sudo -u canvas yarn gulp rev", "Building assets")
                 ]
                 
-                for i, (cmd, desc) in enumerate(commands):
+                for i, (cmd, desc) in enumerate(commands, start=1):
                     progress.update(task, description=desc, completed=i)
                     self.run_command(cmd, desc, timeout=1800)  # 30 min timeout for long operations
                     progress.update(task, completed=i+1)
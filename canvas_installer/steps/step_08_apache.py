@@ -2,7 +2,7 @@
 Step 8: Install and Configure Apache
 """
 
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import SpinnerColumn, TextColumn
 from .base_step import BaseStep
 
 
@@ -22,7 +22,7 @@ class ApacheStep(BaseStep):
         self.log_start()
         
         try:
-            with Progress(
+            with self.progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 transient=True
@@ -30,36 +30,42 @@ class ApacheStep(BaseStep):
                 
                 task = progress.add_task("Installing Apache...", total=None)
                 
-                # Install Apache and Passenger
+                # Install Apache and Passenger. The key and HTTPS tools have to be
+                # in place before the Passenger source can be used; after that
+                # only its list is refreshed and everything else is one install.
+                # Package lists are installed with apt_install_batch
                 commands = [
-                    "sudo apt-get install -y apache2",
-                    "sudo apt-get install -y dirmngr gnupg apt-transport-https ca-certificates",
+                    ["dirmngr", "gnupg", "apt-transport-https", "ca-certificates"],
                     "sudo apt-key adv --keyserver hkp://keyserver.ubuntu.com:80 --recv-keys 561F9B9CAC40B2F7",
-                    "sudo sh -c 'echo deb https://oss-binaries.phusionpassenger.com/apt/passenger $(lsb_release -cs) main > /etc/apt/sources.list.d/passenger.list'",
-                    "sudo apt-get update",
-                    "sudo apt-get install -y libapache2-mod-passenger"
+                    f"echo 'deb https://oss-binaries.phusionpassenger.com/apt/passenger {self.config.distro_codename} main' | sudo tee /etc/apt/sources.list.d/passenger.list",
+                    "sudo apt-get update -o Dir::Etc::sourcelist=sources.list.d/passenger.list -o Dir::Etc::sourceparts=- -o APT::Get::List-Cleanup=0",
+                    ["apache2", "libapache2-mod-passenger"]
                 ]
                 
                 for cmd in commands:
-                    self.run_command(cmd, "Apache installation")
+                    if isinstance(cmd, list):
+                        self.apt_install_batch(cmd, "Apache installation")
+                    else:
+                        self.run_command(cmd, "Apache installation")
                 
                 # Enable Apache modules
                 progress.update(task, description="Configuring Apache modules...")
                 modules = ["rewrite", "passenger", "ssl", "proxy_http"]
-                for module in modules:
-                    self.run_command(f"sudo a2enmod {module}", f"Enabling {module} module")
+                self.run_command(f"sudo a2enmod {' '.join(modules)}", "Enabling Apache modules")
                 
                 # Configure Passenger
                 progress.update(task, description="Configuring Passenger...")
-                passenger_config = """PassengerDefaultUser canvas
+                # Kept in its own conf-available file (loaded after the modules)
+                # so reruns overwrite it instead of appending to passenger.conf
+                passenger_config = """<IfModule mod_passenger.c>
+PassengerDefaultUser canvas
 PassengerStartTimeout 180
 PassengerPreloadBundler On
-PassengerFriendlyErrorPages On"""
+PassengerFriendlyErrorPages On
+</IfModule>"""
                 
-                self.run_command(
-                    f'echo "{passenger_config}" | sudo tee -a /etc/apache2/mods-available/passenger.conf',
-                    "Adding Passenger configuration"
-                )
+                self.write_config_file("/etc/apache2/conf-available/passenger-canvas.conf", passenger_config, sudo=True)
+                self.run_command("sudo a2enconf passenger-canvas", "Enabling Passenger configuration")
                 
                 # Restart Apache
                 self.run_command("sudo systemctl restart apache2", "Restarting Apache")
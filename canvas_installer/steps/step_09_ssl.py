@@ -27,20 +27,15 @@ class SSLStep(BaseStep):
         try:
             # Install Certbot
             self.console.print("[cyan]Installing Certbot...[/cyan]")
-            commands = [
-                "sudo apt update",
-                "sudo apt install -y certbot python3-certbot-apache"
-            ]
-            
-            for cmd in commands:
-                self.run_command(cmd, "Certbot installation")
+            # Package lists were refreshed by the steps this one waits on
+            self.apt_install_batch(["certbot", "python3-certbot-apache"], "Certbot installation")
             
             # Get SSL certificate
             self.console.print("[cyan]Obtaining SSL certificate...[/cyan]")
             self.console.print(f"[yellow]Please follow the Certbot prompts for domain: {self.config.domain}[/yellow]")
             
             ssl_cmd = f"sudo certbot --apache -d {self.config.domain}"
-            self.run_command(ssl_cmd, "Getting SSL certificate")
+            self.run_command(ssl_cmd, "Getting SSL certificate", interactive=True)
             
             # Setup auto-renewal
             self.console.print("[cyan]Setting up automatic renewal...[/cyan]")
@@ -24,8 +24,8 @@ class VirtualHostsStep(BaseStep):
             # Disable default sites
             self.console.print("[cyan]Disabling default Apache sites...[/cyan]")
             default_sites = ["000-default", "default-ssl", "000-default-le-ssl"]
-            for site in default_sites:
-                self.run_command(f"sudo a2dissite {site} 2>/dev/null || true", f"Disabling {site}")
+            # a2dissite carries on past sites that don't exist, so one call covers all of them
+            self.run_command(f"sudo a2dissite {' '.join(default_sites)} 2>/dev/null || true", "Disabling default sites")
             
             # Create Canvas HTTP virtual host
             self.console.print("[cyan]Creating Canvas virtual host...[/cyan]")
@@ -42,7 +42,7 @@ class VirtualHostsStep(BaseStep):
     </Directory>
 </VirtualHost>"""
             
-            self.write_config_file("/etc/apache2/sites-available/canvas.conf", http_vhost, sudo=True)
+            vhost_files = [("/etc/apache2/sites-available/canvas.conf", http_vhost)]
             
             # Create Canvas HTTPS virtual host if SSL is enabled
             if not self.config.skip_ssl:
@@ -72,11 +72,13 @@ class VirtualHostsStep(BaseStep):
 </VirtualHost>
 </IfModule>"""
                 
-                self.write_config_file("/etc/apache2/sites-available/canvas-ssl.conf", https_vhost, sudo=True)
-                self.run_command("sudo a2ensite canvas-ssl.conf", "Enabling HTTPS site")
+                vhost_files.append(("/etc/apache2/sites-available/canvas-ssl.conf", https_vhost))
             
-            # Enable Canvas site
-            self.run_command("sudo a2ensite canvas.conf", "Enabling Canvas HTTP site")
+            self.write_config_files_batch(vhost_files, "Writing Canvas virtual hosts")
+            
+            # Enable Canvas sites
+            sites = ["canvas.conf"] if self.config.skip_ssl else ["canvas.conf", "canvas-ssl.conf"]
+            self.run_command(f"sudo a2ensite {' '.join(sites)}", "Enabling Canvas sites")
             
             # Restart Apache
             self.run_command("sudo systemctl restart apache2", "Restarting Apache")
@@ -45,12 +45,13 @@ class JobsFirewallStep(BaseStep):
                 ("ssh", "SSH")
             ]
             
-            for port, desc in firewall_ports:
-                self.run_command(f"sudo ufw allow {port}", f"Allowing {desc}")
-            
-            # Enable firewall
-            self.run_command("sudo ufw --force enable", "Enabling firewall")
-            self.run_command("sudo ufw reload", "Reloading firewall")
+            # Add every rule in one root shell, then enable once; enabling
+            # loads the rules, so no separate reload is needed
+            ports = " ".join(port for port, _ in firewall_ports)
+            self.run_command(
+                f"sudo bash -c 'for p in {ports}; do ufw allow $p || exit 1; done; ufw --force enable'",
+                f"Allowing {', '.join(desc for _, desc in firewall_ports)} and enabling firewall"
+            )
             
             self.log_success()
             return True
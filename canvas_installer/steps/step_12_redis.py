@@ -2,7 +2,9 @@
 Step 12: Setup Redis Cache
 """
 
+import os
 from .base_step import BaseStep
+from .step_06_configure_canvas import CACHE_STORE_CONFIG, REDIS_CONFIG
 
 
 class RedisStep(BaseStep):
@@ -23,47 +25,23 @@ class RedisStep(BaseStep):
         try:
             # Install Redis
             self.console.print("[cyan]Installing Redis server...[/cyan]")
-            commands = [
-                "sudo add-apt-repository -y ppa:chris-lea/redis-server",
-                "sudo apt-get update",
-                "sudo apt-get install -y redis-server"
-            ]
-            
-            for cmd in commands:
-                self.run_command(cmd, "Redis installation")
-            
-            # Start and enable Redis
-            self.run_command("sudo systemctl start redis-server", "Starting Redis")
-            self.run_command("sudo systemctl enable redis-server", "Enabling Redis")
-            
-            # Configure cache store
-            self.console.print("[cyan]Configuring cache store...[/cyan]")
-            cache_config = """test:
-  cache_store: redis_cache_store
-development:
-  cache_store: redis_cache_store
-production:
-  cache_store: redis_cache_store"""
-            
-            self.write_config_file("/var/canvas/config/cache_store.yml", cache_config, sudo=True)
-            
-            # Configure Redis connection
-            redis_config = """production:
-  url:
-    - redis://localhost
-
-development:
-  url:
-    - redis://localhost
-
-test:
-  url:
-    - redis://localhost"""
-            
-            self.write_config_file("/var/canvas/config/redis.yml", redis_config, sudo=True)
-            
-            # Restart Redis
-            self.run_command("sudo systemctl restart redis-server", "Restarting Redis")
+            # add-apt-repository refreshes the package lists itself
+            self.run_command("sudo add-apt-repository -y ppa:chris-lea/redis-server", "Redis installation")
+            self.apt_install_batch(["redis-server"], "Redis installation")
+            
+            # Start and enable Redis. Canvas's cache_store.yml and redis.yml are
+            # written by ConfigureCanvasStep, so this step doesn't need the
+            # Canvas checkout and can run alongside the other installs
+            self.run_command("sudo systemctl enable --now redis-server", "Starting and enabling Redis")
+            
+            # An install resumed from state saved before ConfigureCanvasStep
+            # wrote the Redis files has the Canvas config without them
+            config_dir = "/var/canvas/config"
+            redis_files = [(f"{config_dir}/cache_store.yml", CACHE_STORE_CONFIG),
+                           (f"{config_dir}/redis.yml", REDIS_CONFIG)]
+            missing = [(path, content) for path, content in redis_files if not os.path.exists(path)]
+            if os.path.isdir(config_dir) and missing:
+                self.write_config_files_batch(missing, "Configuring Canvas to use Redis")
             
             self.log_success()
             return True
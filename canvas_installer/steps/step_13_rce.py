@@ -2,7 +2,6 @@
 Step 13: Setup Rich Content Editor
 """
 
-import secrets
 from .base_step import BaseStep
 
 
@@ -29,46 +28,43 @@ class RCEStep(BaseStep):
             # Clone RCE API with proper ownership handling
             self.console.print("[cyan]Cloning Canvas RCE API...[/cyan]")
             
-            # Step 1: Clone RCE repository with Git configuration
-            clone_cmd = '''bash -c "
-                # Configure Git for root user
-                git config --global --add safe.directory '*' &&
-                
-                # Clone RCE API
+            # Step 1: Clone RCE repository, or update the checkout from an earlier
+            # run, then set proper ownership immediately (CloneCanvasStep already
+            # marked every directory safe for root's Git)
+            clone_cmd = '''
                 cd /var &&
-                git clone https://github.com/instructure/canvas-rce-api.git &&
-                
-                # Set proper ownership immediately
+                if [ -d /var/canvas-rce-api/.git ]; then
+                    git -C /var/canvas-rce-api fetch --depth 1 origin HEAD &&
+                    git -C /var/canvas-rce-api reset --hard FETCH_HEAD
+                else
+                    git clone --depth 1 https://github.com/instructure/canvas-rce-api.git
+                fi &&
                 chown -R canvas:canvas /var/canvas-rce-api
-            "'''
+            '''
             
             self.run_command(clone_cmd, "Cloning RCE API repository", timeout=300)
             
             # Step 2: Install npm packages as canvas user
-            npm_cmd = '''bash -c "
+            # npm ci installs straight from the lockfile when there is one
+            npm_cmd = '''
                 cd /var/canvas-rce-api &&
-                sudo -u canvas npm install --production &&
-                sudo -u canvas npm audit fix --force
-            "'''
+                if [ -f package-lock.json ]; then
+                    sudo -u canvas npm ci --production --prefer-offline --no-audit --no-fund
+                else
+                    sudo -u canvas npm install --production --prefer-offline --no-audit --no-fund
+                fi
+            '''
             
             self.run_command(npm_cmd, "Installing RCE API dependencies", timeout=900)
             
-            # Generate secrets
-            self.console.print("[cyan]Generating RCE secrets...[/cyan]")
-            ecosystem_secret = secrets.token_hex(32)
-            ecosystem_key = secrets.token_hex(32)
-            cipher_password = secrets.token_hex(16)
-            
             # Create .env file for RCE API
             rce_env = f"""NODE_ENV=production
-ECOSYSTEM_SECRET={ecosystem_secret}
-ECOSYSTEM_KEY={ecosystem_key}
-CIPHER_PASSWORD={cipher_password}
+ECOSYSTEM_SECRET={self.config.ecosystem_secret}
+ECOSYSTEM_KEY={self.config.ecosystem_key}
+CIPHER_PASSWORD={self.config.cipher_password}
 FLICKR_API_KEY={self.config.flickr_api_key}
 YOUTUBE_API_KEY={self.config.youtube_api_key}"""
             
-            self.write_config_file("/var/canvas-rce-api/.env", rce_env, sudo=True)
-            
             # Configure vault_contents.yml
             self.console.print("[cyan]Configuring Canvas vault contents...[/cyan]")
             vault_config = f"""production:
@@ -83,14 +79,17 @@ YOUTUBE_API_KEY={self.config.youtube_api_key}"""
   'app-canvas/data/secrets':
     data:
       canvas_security:
-        encryption_secret: "{ecosystem_key}"
-        signing_secret: "{ecosystem_secret}"
+        encryption_secret: "{self.config.ecosystem_key}"
+        signing_secret: "{self.config.ecosystem_secret}"
 """
             
-            self.write_config_file("/var/canvas/config/vault_contents.yml", vault_config, sudo=True)
+            self.write_config_files_batch([
+                ("/var/canvas-rce-api/.env", rce_env),
+                ("/var/canvas/config/vault_contents.yml", vault_config)
+            ], "Writing RCE configuration")
             
             # Install screen for background process
-            self.run_command("sudo apt install -y screen", "Installing screen")
+            self.apt_install_batch(["screen"], "Installing screen")
             
             self.log_success()
             self.console.print("[yellow]Note: You'll need to manually start the RCE server with:[/yellow]")
@@ -23,9 +23,12 @@ class FinalizeStep(BaseStep):
         try:
             # Set correct permissions
             self.console.print("[cyan]Setting file permissions...[/cyan]")
+            # Walk the tree once and only chown what isn't canvas-owned yet
+            # (most of it already is), spreading the work over all CPUs
             commands = [
-                "cd /var/canvas && sudo chown -R canvas:canvas .",
-                "sudo find /var/canvas/config/ -type f -exec chmod 400 {} +"
+                "sudo find /var/canvas \\( ! -user canvas -o ! -group canvas \\) -print0"
+                " | sudo xargs -0 -r -n 256 -P \"$(nproc)\" chown -h canvas:canvas",
+                "sudo find /var/canvas/config/ -type f -print0 | sudo xargs -0 -r -n 64 -P \"$(nproc)\" chmod 400"
             ]
             
             for cmd in commands:
@@ -34,13 +37,8 @@ class FinalizeStep(BaseStep):
             # Optional: Setup X-Sendfile optimization
             if not self.config.skip_optimization:
                 self.console.print("[cyan]Setting up file download optimization...[/cyan]")
-                opt_commands = [
-                    "sudo apt-get install -y libapache2-mod-xsendfile",
-                    "sudo systemctl reload apache2"
-                ]
-                
-                for cmd in opt_commands:
-                    self.run_command(cmd, "Optimization setup")
+                self.apt_install_batch(["libapache2-mod-xsendfile"], "Optimization setup")
+                self.run_command("sudo systemctl reload apache2", "Optimization setup")
                 
                 # Create production-local.rb config
                 prod_local_config = """# X-Sendfile optimization for file downloads
@@ -2,41 +2,256 @@
 Utility functions for Canvas LMS installer
 """
 
+import asyncio
+import atexit
 import os
+import platform
+import re
+import selectors
+import shlex
+import signal
 import subprocess
+import sys
 import logging
-from typing import Tuple
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+
+# dpkg allows one package operation at a time; steps running in parallel
+# queue on this lock instead of failing on /var/lib/dpkg/lock-frontend
+_APT_LOCK = threading.Lock()
+_APT_COMMAND = re.compile(r'\b(apt|apt-get|apt-key|add-apt-repository|dpkg)\b')
+
+# Commands without any of these can be exec'd directly instead of via /bin/sh
+_SHELL_SYNTAX = re.compile(r'[|&;<>()$`*?\[\]{}~#\n]')
+
+# One persistent shell per thread, so steps running in parallel don't queue
+# behind each other's commands
+_shells = threading.local()
+
+# Every shell created, so they can all be killed on Ctrl-C or exit: each runs
+# in its own session, out of reach of the terminal's SIGINT
+_all_shells = []
+_all_shells_lock = threading.Lock()
+_shells_closed = threading.Event()
+
+
+class PersistentShell:
+    """A long-lived root bash process that commands are fed to over stdin
+    
+    Saves a fork/exec, shell startup and sudo authentication per command.
+    Each command runs in a subshell with stdin from /dev/null, starting from
+    the installer's working directory, so exports and cds don't leak into
+    later commands. Anything that needs a terminal must not be sent here.
+    """
+    
+    # Bytes of output kept per command, e.g. for the error log on failure
+    OUTPUT_LIMIT = 1024 * 1024
+    
+    def __init__(self):
+        self.argv = ["bash", "--noprofile", "--norc"]
+        if os.geteuid() != 0:
+            self.argv = ["sudo", "--preserve-env"] + self.argv
+        self.cwd = os.getcwd()
+        self.proc = None
+        with _all_shells_lock:
+            _all_shells.append(self)
+    
+    def close(self):
+        """Terminate the shell and anything it is still running"""
+        if self.proc is not None and self.proc.poll() is None:
+            os.killpg(self.proc.pid, 9)
+            self.proc.wait()
+        self.proc = None
+    
+    def run(self, command: str, timeout: int, echo: bool = False,
+            on_line: Optional[Callable[[str], None]] = None,
+            log_line: Optional[Callable[[str], None]] = None) -> Tuple[int, str]:
+        """Run command and return its exit code and combined output
+        
+        Output is handled as it arrives: with echo it is written to stdout,
+        on_line is called with the latest non-empty line of each chunk read,
+        and log_line with every non-empty line. Only the last OUTPUT_LIMIT
+        bytes are kept for the return value.
+        """
+        if _shells_closed.is_set():
+            raise RuntimeError("Installation interrupted; not running further commands")
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                self.argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0,
+                start_new_session=True
+            )
+        
+        # The exit status follows a unique marker on its own line
+        token = f"__CANVAS_INSTALLER_DONE_{uuid.uuid4().hex}__"
+        marker = f"\n{token}".encode()
+        script = f"cd {shlex.quote(self.cwd)}\n(\n{command}\n) < /dev/null\nprintf '\\n{token}%d\\n' $?\n"
+        self.proc.stdin.write(script.encode())
+        
+        partial = b""  # Start of a line log_line hasn't been given yet
+        
+        def show(data: bytes, final: bool = False):
+            nonlocal partial
+            self._show(data, echo, on_line)
+            if log_line is None:
+                return
+            lines = re.split(rb"[\r\n]", partial + data)
+            partial = b"" if final else lines.pop()
+            if len(partial) > 65536:
+                lines.append(partial)
+                partial = b""
+            for line in lines:
+                if line.strip():
+                    log_line(line.decode(errors="replace").rstrip())
+        
+        fd = self.proc.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        output = bytearray()
+        shown = 0  # output[:shown] has been echoed and passed to on_line
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout, output=output.decode(errors="replace"))
+                
+                if not selector.select(remaining):
+                    continue
+                
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    # The command exited the shell itself
+                    returncode = self.proc.wait()
+                    self.proc = None
+                    end = len(output)
+                    break
+                output += chunk
+                
+                index = output.find(marker)
+                if index != -1 and output.endswith(b"\n"):
+                    returncode = int(output[index + len(marker):].strip())
+                    end = index
+                    break
+                
+                # Hold back enough bytes that a partially received marker is never shown
+                safe = max(shown, len(output) - len(marker) - 8)
+                show(output[shown:safe])
+                shown = safe
+                
+                if len(output) > self.OUTPUT_LIMIT:
+                    excess = len(output) - self.OUTPUT_LIMIT
+                    del output[:excess]
+                    shown = max(0, shown - excess)
+        
+        show(output[shown:end], final=True)
+        return returncode, output[:end].decode(errors="replace")
+    
+    @staticmethod
+    def _show(data: bytes, echo: bool, on_line: Optional[Callable[[str], None]]):
+        """Echo a chunk of output and report its last non-empty line"""
+        if not data:
+            return
+        if echo:
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+        if on_line is not None:
+            for line in reversed(data.splitlines()):
+                if line.strip():
+                    on_line(line.decode(errors="replace").strip())
+                    break
+
+
+def close_all_shells():
+    """Kill every persistent shell and what it is running; no new commands start after this
+    
+    Only signals the process groups, so it is safe to call from another
+    thread while a command is being read: that reader sees the shell exit.
+    """
+    _shells_closed.set()
+    with _all_shells_lock:
+        shells = list(_all_shells)
+    for shell in shells:
+        proc = shell.proc
+        if proc is not None and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+atexit.register(close_all_shells)
+
+
+def _shell() -> PersistentShell:
+    """Return the calling thread's persistent shell"""
+    if not hasattr(_shells, "shell"):
+        _shells.shell = PersistentShell()
+    return _shells.shell
 
 
 class CommandRunner:
     """Utility class for running shell commands with logging and error handling"""
     
+    # Background `apt-get install --download-only`; apt commands wait for it so
+    # they don't collide on the archive lock and find the .debs already cached
+    prefetch_proc = None
+    
     def __init__(self, logger: logging.Logger):
         self.logger = logger
     
-    def run_command(self, command: str, description: str = "", show_output: bool = True, timeout: int = 600) -> subprocess.CompletedProcess:
-        """Execute a shell command with logging and error handling"""
+    def run_command(self, command: Union[str, List[str]], description: str = "", show_output: bool = True, timeout: int = 600,
+                    interactive: bool = False,
+                    on_line: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """Execute a shell command with logging and error handling
+        
+        Commands run in the thread's persistent shell unless interactive is set,
+        in which case a fresh shell attached to the terminal is used. on_line
+        receives the latest line of output while the command runs. command may
+        also be an argv list, which is quoted for the persistent shell.
+        """
+        argv = None
+        if isinstance(command, str):
+            if not _SHELL_SYNTAX.search(command):
+                argv = shlex.split(command)
+                if argv and "=" in argv[0]:
+                    argv = None  # Leading variable assignment needs a shell
+        else:
+            argv = list(command)
+            command = shlex.join(argv)
+        
         self.logger.info(f"Executing: {description or command}")
         
+        apt_guard = _APT_LOCK if _APT_COMMAND.search(command) else nullcontext()
         try:
-            if show_output:
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    check=True,
-                    timeout=timeout,
-                    text=True,
-                    capture_output=False
-                )
-            else:
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    check=True,
-                    timeout=timeout,
-                    text=True,
-                    capture_output=True
-                )
+            with apt_guard:
+                if apt_guard is _APT_LOCK and CommandRunner.prefetch_proc is not None:
+                    CommandRunner.prefetch_proc.wait()
+                if interactive:
+                    result = subprocess.run(
+                        argv or command,
+                        shell=not argv,
+                        check=True,
+                        timeout=timeout,
+                        text=True
+                    )
+                else:
+                    # Output that isn't shown goes to the debug log line by line
+                    log_line = None
+                    if not show_output and self.logger.isEnabledFor(logging.DEBUG):
+                        log_line = self.logger.debug
+                    returncode, output = _shell().run(command, timeout, echo=show_output,
+                                                      on_line=on_line, log_line=log_line)
+                    if returncode != 0:
+                        raise subprocess.CalledProcessError(returncode, command, output=output, stderr=output)
+                    result = subprocess.CompletedProcess(command, returncode, stdout=output)
             
             self.logger.info(f"Command completed successfully: {description or command}")
             return result
@@ -53,60 +268,137 @@ class CommandRunner:
             self.logger.error(f"Unexpected error running command: {description or command} - {e}")
             raise
 
+    def apt_install_batch(self, packages: List[str], description: str = "Installing packages",
+                          show_output: bool = True, timeout: int = 600,
+                          on_line: Optional[Callable[[str], None]] = None,
+                          no_recommends: bool = False) -> subprocess.CompletedProcess:
+        """Install packages in one apt-get call, so apt solves and downloads once
+        
+        Every package install goes through here, so they all share the same
+        non-interactive flags. Recommended packages are installed as apt
+        normally would unless no_recommends is set.
+        """
+        recommends = "--no-install-recommends " if no_recommends else ""
+        return self.run_command(
+            f"sudo DEBIAN_FRONTEND=noninteractive apt-get install -y {recommends}"
+            f"-o Dpkg::Use-Pty=0 {' '.join(packages)}",
+            description, show_output, timeout, on_line=on_line
+        )
+    
     def write_config_file(self, filepath: str, content: str, sudo: bool = False):
         """Write configuration file with proper permissions"""
         if sudo:
-            # Use sudo to write the file
-            cmd = f'echo "{content}" | sudo tee {filepath} > /dev/null'
-            self.run_command(cmd, f"Writing config file {filepath}")
+            # Hand the content to tee on stdin, so it's written byte for byte
+            # and never passes through a shell
+            self._run_with_input(['sudo', 'tee', filepath], content, f"Writing config file {filepath}")
             self.run_command(f"sudo chown canvas:canvas {filepath}", f"Setting ownership for {filepath}")
         else:
             # Write file directly
             with open(filepath, 'w') as f:
                 f.write(content)
+    
+    def write_config_files_batch(self, files: List[Tuple[str, str]], description: str = "Writing config files"):
+        """Write several (path, content) config files owned by canvas in one root shell"""
+        delimiter = f"CANVAS_EOF_{uuid.uuid4().hex}"
+        script = []
+        for filepath, content in files:
+            if not content.endswith("\n"):
+                content += "\n"
+            # Quoted heredoc delimiter: the content is written verbatim
+            script.append(f"cat > {shlex.quote(filepath)} <<'{delimiter}'\n{content}{delimiter}\n")
+        script.append(f"chown canvas:canvas {' '.join(shlex.quote(filepath) for filepath, _ in files)}\n")
+        # The script goes to a single sudo sh on stdin: one process for every file
+        self._run_with_input(['sudo', 'sh', '-e'], "".join(script), description)
+    
+    def _run_with_input(self, args: List[str], data: str, description: str):
+        """Run args without a shell, feeding data on stdin, with run_command's logging"""
+        self.logger.info(f"Executing: {description}")
+        try:
+            subprocess.run(args, input=data, text=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        except subprocess.CalledProcessError as e:
+            self.logger.error(f"Command failed: {description} - Exit code: {e.returncode}")
+            if e.stderr:
+                self.logger.error(f"Error output: {e.stderr}")
+            raise
+        self.logger.info(f"Command completed successfully: {description}")
 
 
 class SystemChecker:
     """Utility class for checking system requirements"""
     
+    # Display name and check, in the order the results are reported
+    CHECKS = (
+        ("Operating System", "check_ubuntu_version"),
+        ("Root/Sudo Access", "check_sudo_access"),
+        ("Hardware Requirements", "check_hardware"),
+        ("Internet Connectivity", "check_internet"),
+        ("Disk Space", "check_disk_space"),
+    )
+    
+    # Free disk space shrinks as the install proceeds, so it is always re-checked
+    VOLATILE_CHECKS = ("Disk Space",)
+    
+    # Outcomes of earlier check_all calls in this process, keyed by name
+    _results: Dict[str, Tuple[bool, str]] = {}
+    
+    @classmethod
+    async def check_all(cls, names=None) -> Dict[str, Union[Tuple[bool, str], BaseException]]:
+        """Run the named checks (all by default) concurrently, keyed by name
+        
+        Checks that already completed in this process are answered from
+        memory, except the volatile ones.
+        """
+        selected = [name for name, _ in cls.CHECKS if names is None or name in names]
+        pending = [(name, check) for name, check in cls.CHECKS
+                   if name in selected and (name not in cls._results or name in cls.VOLATILE_CHECKS)]
+        results = await asyncio.gather(
+            *(getattr(cls, check)() for _, check in pending),
+            return_exceptions=True
+        )
+        fresh = {name: result for (name, _), result in zip(pending, results)}
+        for name, result in fresh.items():
+            if not isinstance(result, BaseException) and name not in cls.VOLATILE_CHECKS:
+                cls._results[name] = result
+        return {name: fresh[name] if name in fresh else cls._results[name] for name in selected}
+    
     @staticmethod
-    def check_ubuntu_version() -> Tuple[bool, str]:
+    async def check_ubuntu_version() -> Tuple[bool, str]:
         """Check if running Ubuntu 22.04"""
+        # Parsed key by key (and cached) by the standard library, so the
+        # version can't be matched from an unrelated field such as a URL
         try:
-            with open('/etc/os-release', 'r') as f:
-                content = f.read()
-                if 'Ubuntu' in content and '22.04' in content:
-                    return True, "Ubuntu 22.04 LTS detected"
-                else:
-                    return False, "Ubuntu 22.04 LTS required"
-        except:
+            os_release = platform.freedesktop_os_release()
+        except OSError:
             return False, "Cannot determine OS version"
+        if os_release.get('ID') == 'ubuntu' and os_release.get('VERSION_ID') == '22.04':
+            return True, "Ubuntu 22.04 LTS detected"
+        return False, "Ubuntu 22.04 LTS required"
 
     @staticmethod
-    def check_sudo_access() -> Tuple[bool, str]:
+    async def check_sudo_access() -> Tuple[bool, str]:
         """Check sudo access"""
-        try:
-            result = subprocess.run(['sudo', '-n', 'true'], capture_output=True)
-            if result.returncode == 0:
-                return True, "Sudo access confirmed"
-            else:
-                return False, "Sudo access required"
-        except:
-            return False, "Cannot verify sudo access"
+        # install_canvas.py requires running as root or under sudo, so the
+        # process's own credentials answer this without probing sudo
+        if os.geteuid() == 0:
+            return True, "Running as root"
+        if os.environ.get('SUDO_USER'):
+            return True, "Sudo access confirmed"
+        return False, "Sudo access required"
 
     @staticmethod
-    def check_hardware() -> Tuple[bool, str]:
+    async def check_hardware() -> Tuple[bool, str]:
         """Check hardware requirements"""
         try:
-            # Check RAM (8GB = 8,000,000 KB approximately)
-            with open('/proc/meminfo', 'r') as f:
-                for line in f:
-                    if line.startswith('MemTotal:'):
-                        mem_kb = int(line.split()[1])
-                        mem_gb = mem_kb / 1024 / 1024
-                        if mem_gb < 7.5:  # Allow some margin
-                            return False, f"RAM: {mem_gb:.1f}GB (8GB required)"
-                        break
+            # Check RAM (8GB = 8,000,000 KB approximately); MemTotal is the
+            # first line, so one short read and a search find it
+            with open('/proc/meminfo', 'rb') as f:
+                data = f.read(512)
+            start = data.find(b'MemTotal:')
+            mem_kb = int(data[start:data.find(b'\n', start)].split()[1])
+            mem_gb = mem_kb / 1024 / 1024
+            if mem_gb < 7.5:  # Allow some margin
+                return False, f"RAM: {mem_gb:.1f}GB (8GB required)"
             
             # Check CPU cores
             cpu_count = os.cpu_count()
@@ -114,37 +406,28 @@ class SystemChecker:
                 return False, f"CPU: {cpu_count} cores (4 required)"
             
             return True, f"RAM: {mem_gb:.1f}GB, CPU: {cpu_count} cores"
-        except:
+        except (OSError, ValueError, IndexError, TypeError):
             return False, "Cannot verify hardware specs"
 
     @staticmethod
-    def check_internet() -> Tuple[bool, str]:
+    async def check_internet() -> Tuple[bool, str]:
         """Check internet connectivity"""
+        # A TCP connect to a public resolver: no ping process, no DNS lookup
         try:
-            result = subprocess.run(['ping', '-c', '1', 'google.com'], 
-                                  capture_output=True, timeout=10)
-            if result.returncode == 0:
-                return True, "Internet connection verified"
-            else:
-                return False, "No internet connection"
-        except:
-            return False, "Cannot verify internet connection"
+            _, writer = await asyncio.wait_for(asyncio.open_connection("1.1.1.1", 53), 3)
+            writer.close()
+            return True, "Internet connection verified"
+        except (OSError, asyncio.TimeoutError):
+            return False, "No internet connection"
 
     @staticmethod
-    def check_disk_space() -> Tuple[bool, str]:
+    async def check_disk_space() -> Tuple[bool, str]:
         """Check available disk space"""
         try:
-            result = subprocess.run(['df', '-h', '/'], capture_output=True, text=True)
-            lines = result.stdout.strip().split('\n')
-            if len(lines) >= 2:
-                parts = lines[1].split()
-                available = parts[3]
-                # Parse available space (e.g., "50G" -> 50)
-                if 'G' in available:
-                    available_gb = float(available.replace('G', ''))
-                    if available_gb < 30:
-                        return False, f"Available: {available} (30GB required)"
-                    return True, f"Available: {available}"
-            return False, "Cannot determine disk space"
-        except:
-            return False, "Cannot check disk space"
\ No newline at end of file
+            st = os.statvfs('/')
+            available_gb = st.f_bavail * st.f_frsize / 1024 ** 3
+            if available_gb < 30:
+                return False, f"Available: {available_gb:.0f}GB (30GB required)"
+            return True, f"Available: {available_gb:.0f}GB"
+        except OSError:
+            return False, "Cannot check disk space"
@@ -4,9 +4,19 @@ Canvas LMS Installer Entry Point
 Run this script to start the Canvas LMS installation process
 """
 
+import importlib
 import sys
 import os
 import subprocess
+import threading
+import time
+
+def package_lists_fresh(max_age: int = 86400) -> bool:
+    """Whether apt's package cache was rebuilt within max_age seconds"""
+    try:
+        return time.time() - os.path.getmtime("/var/cache/apt/pkgcache.bin") < max_age
+    except OSError:
+        return False
 
 def check_and_install_dependencies():
     """Check and install required dependencies"""
@@ -16,16 +26,26 @@ def check_and_install_dependencies():
         print("Please run with: sudo python3 install_canvas.py")
         sys.exit(1)
     
-    # Configure Git globally to prevent ownership issues
+    # Configure Git globally to prevent ownership issues. One read of the
+    # global config, then a single append of whatever isn't set yet
     try:
-        print("Configuring Git for installation...")
-        subprocess.run(["git", "config", "--global", "--add", "safe.directory", "*"],
-                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        subprocess.run(["git", "config", "--global", "user.name", "Canvas Installer"],
-                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        subprocess.run(["git", "config", "--global", "user.email", "installer@canvas.local"],
-                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except:
+        current = subprocess.run(["git", "config", "--global", "--list"],
+                                 capture_output=True, text=True).stdout.splitlines()
+        missing = ""
+        if "safe.directory=*" not in current:
+            missing += "[safe]\n\tdirectory = *\n"
+        user = ""
+        if not any(line.startswith("user.name=") for line in current):
+            user += "\tname = Canvas Installer\n"
+        if not any(line.startswith("user.email=") for line in current):
+            user += "\temail = installer@canvas.local\n"
+        if user:
+            missing += f"[user]\n{user}"
+        if missing:
+            print("Configuring Git for installation...")
+            with open(os.path.expanduser("~/.gitconfig"), "a") as f:
+                f.write("\n" + missing)
+    except (OSError, subprocess.SubprocessError):
         pass  # Git config is not critical for dependency installation
     
     # Try to import rich
@@ -37,37 +57,31 @@ def check_and_install_dependencies():
     
     print("Installing required dependencies...")
     
-    # Try different methods to install rich
-    methods = [
-        # Method 1: Install pip and then rich
-        ["apt", "update"],
-        ["apt", "install", "-y", "python3-pip"],
-        [sys.executable, "-m", "pip", "install", "rich"],
-        
-        # Method 2: Use apt package directly (fallback)
-        ["apt", "install", "-y", "python3-rich"]
-    ]
-    
-    # Try pip installation first
+    # The distro package is one small apt install, with no apt update or
+    # pip resolve, so try it first and fall back to pip
     try:
-        print("Updating package lists...")
-        subprocess.check_call(["apt", "update"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        print("Installing pip...")
-        subprocess.check_call(["apt", "install", "-y", "python3-pip"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
         print("Installing Rich library...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "rich"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
+        subprocess.check_call(["apt", "install", "-y", "python3-rich"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         # Test import
         import rich
         print("Dependencies installed successfully!")
         return True
         
     except (subprocess.CalledProcessError, ImportError):
-        print("Pip installation failed, trying apt package...")
+        print("Apt package installation failed, trying pip...")
         try:
-            subprocess.check_call(["apt", "install", "-y", "python3-rich"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            # One shell for the whole chain instead of a process per command;
+            # package lists refreshed within the last day are used as they are
+            chain = f"apt install -y python3-pip && {sys.executable} -m pip install rich"
+            if package_lists_fresh():
+                print("Installing pip and the Rich library...")
+            else:
+                print("Updating package lists and installing pip and the Rich library...")
+                chain = f"apt update && {chain}"
+            subprocess.check_call(
+                chain,
+                shell=True, executable="/bin/bash", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
             # Test import
             import rich
             print("Dependencies installed successfully!")
@@ -75,11 +89,16 @@ def check_and_install_dependencies():
         except (subprocess.CalledProcessError, ImportError):
             print("\nERROR: Failed to install Rich library automatically.")
             print("\nPlease install manually with one of these commands:")
-            print("  sudo apt update && sudo apt install -y python3-pip && pip3 install rich")
             print("  sudo apt install -y python3-rich")
+            print("  sudo apt update && sudo apt install -y python3-pip && pip3 install rich")
             print("\nThen run the installer again.")
             sys.exit(1)
 
+def preload_rich():
+    """Import the rich modules the installation steps use"""
+    importlib.import_module("rich.progress")
+    importlib.import_module("rich.table")
+
 def main():
     """Main entry point"""
     # Check and install dependencies first
@@ -91,6 +110,9 @@ def main():
     # Import and run the main installer
     try:
         from canvas_installer.installer import main as installer_main
+        # Load the steps' progress bars and tables in the background while
+        # the installer prompts for its configuration and runs the checks
+        threading.Thread(target=preload_rich, daemon=True).start()
         installer_main()
     except ImportError as e:
         print(f"ERROR: Failed to import installer: {e}")